@@ -1,24 +1,63 @@
 import heapq
+import math
 import time
 from Map import *
+from CompactGraph import CompactGraph
 
 __author__ = "Michael Graham - mig445 - 11139592"
 __email__ = "mig445@mail.usask.ca"
 # Creation date: February 7, 2016
 
 
+def zero_heuristic(state, goal_state, graph):
+    """
+    No estimate at all -- turns A* into uniform cost search (Dijkstra)
+    :param state: the current node
+    :param goal_state: the goal node
+    :param graph: the graph
+    :return: 0
+    """
+    return 0
+
+
+def manhattan_heuristic(state, goal_state, graph):
+    """
+    Manhattan distance between two (x, y) nodes, scaled by the cheapest edge in the graph.
+    Admissible (and consistent) on the 4-connected grids that makeMap creates.
+    :param state: the current node
+    :param goal_state: the goal node
+    :param graph: the graph
+    :return: a lower bound on the cost from state to goal_state
+    """
+    return min_edge_weight(graph) * (abs(state[0] - goal_state[0]) + abs(state[1] - goal_state[1]))
+
+
+def euclidean_heuristic(state, goal_state, graph):
+    """
+    Straight line distance between two (x, y) nodes, scaled by the cheapest edge in the graph.
+    Never larger than the manhattan heuristic, so it is admissible wherever that one is.
+    :param state: the current node
+    :param goal_state: the goal node
+    :param graph: the graph
+    :return: a lower bound on the cost from state to goal_state
+    """
+    return min_edge_weight(graph) * math.hypot(state[0] - goal_state[0], state[1] - goal_state[1])
+
+
 class Problem:
-    def __init__(self, initial_state, goal_state, graph):
+    def __init__(self, initial_state, goal_state, graph, heuristic=manhattan_heuristic):
         """
         Initializes a problem (who'd wanna do that?)
         :param initial_state: state is the start node
         :param goal_state: the goal node
         :param graph: the graph
+        :param heuristic: function(state, goal_state, graph) estimating the remaining cost
         :return: an initialized problem
         """
         self.initial_state = initial_state
         self.goal_state = goal_state
         self.graph = graph
+        self.heuristic = heuristic
 
     def initial_state(self):
         """
@@ -49,14 +88,84 @@ class Problem:
         """
         return state == self.goal_state
 
+    def estimate(self, state):
+        """
+        Estimates the cost that is left to get from the state to the goal
+        :param state: the current node
+        :return: the heuristic value of the state
+        """
+        return self.heuristic(state, self.goal_state, self.graph)
+
     def successors(self, state):
         """
         Returns the successors of the current state (node)
         :param state: the current node of the graph
-        :return: the children of the state (node)
+        :return: the children of the state (node) -- works on networkx graphs and CompactGraphs
         """
+        if isinstance(self.graph, CompactGraph):
+            return self.graph.neighbors(state)
         return self.graph[state]
 
+    def weighted_successors(self, state):
+        """
+        Returns the successors of the current state together with the cost of getting to them
+        :param state: the current node of the graph
+        :return: (child, edge weight) pairs -- works on networkx graphs and CompactGraphs
+        """
+        if isinstance(self.graph, CompactGraph):
+            return self.graph.weighted_neighbours(state)
+        return ((next_state, data['weight']) for next_state, data in self.graph[state].items())
+
+
+class MultiGoalProblem(Problem):
+    def __init__(self, initial_state, goal_states, graph, heuristic=zero_heuristic):
+        """
+        Initializes a problem that is solved by reaching any one of several goals
+        :param initial_state: state is the start node
+        :param goal_states: the goal nodes
+        :param graph: the graph
+        :param heuristic: function(state, goal_state, graph) -- the estimate is the smallest one over
+                          all of the goals, so the default zero_heuristic gives a single Dijkstra sweep
+        :return: an initialized problem
+        """
+        Problem.__init__(self, initial_state, None, graph, heuristic)
+        self.goal_states = set(goal_states)
+
+    def is_goal(self, state):
+        """
+        Checks if the current state is one of the goals
+        :param state: the current node
+        :return: True if the current state is a goal
+        """
+        return state in self.goal_states
+
+    def estimate(self, state):
+        """
+        Estimates the cost that is left to get from the state to the closest goal
+        :param state: the current node
+        :return: the heuristic value of the state
+        """
+        if self.heuristic is zero_heuristic:
+            return 0
+        return min(self.heuristic(state, goal_state, self.graph) for goal_state in self.goal_states)
+
+
+def frontier_stats(stats, frontier_size, max_frontier):
+    """
+    Fills in the frontier counters of a search's stats. Every entry that was pushed onto the frontier was
+    either popped (expanded or thrown away as stale) or is still on it, so pushes don't have to be counted
+    one at a time in the inner loop.
+
+    :param stats: the stats of the search, with nodes_expanded and stale_pops
+    :param frontier_size: the number of entries left on the frontier
+    :param max_frontier: the most entries that were on the frontier at once
+    :return: stats, with pops, pushes and max_frontier added
+    """
+    stats['pops'] = stats['nodes_expanded'] + stats['stale_pops']
+    stats['pushes'] = stats['pops'] + frontier_size
+    stats['max_frontier'] = max_frontier
+    return stats
+
 
 class StateQueue(object):
     def __init__(self, problem):
@@ -68,36 +177,50 @@ class StateQueue(object):
         super(StateQueue, self).__init__()
         self.problem = problem
         self.frontier = []
-        heapq.heappush(self.frontier, (0, problem.initial_state))
+        heapq.heappush(self.frontier, (problem.estimate(problem.initial_state), problem.initial_state))
         self.path = {problem.initial_state: None}  # where explored is a dictionary to keep track of visited
         self.cost = {problem.initial_state: 0}  # where cost is the cost to get to the current state
+        self.closed = set()  # states that have been taken off of the frontier with their cheapest cost
+        self.stale_pops = 0  # outdated frontier entries that were thrown away instead of being expanded
+        self.max_frontier = 1
 
     def add(self, cost, state, parent):
         """
         Adds a state to the frontier of possible paths
-          -- Frontier is a heapq (priority queue) that contains a tuple with the cost and state
+          -- Frontier is a heapq (priority queue) that contains a tuple with the priority and state,
+             where the priority is the cost so far plus the heuristic estimate of the problem
         Also maintains a path of what state we came from to get to the next state
         :param cost: The cost to get to that state
         :param state: The current state
         :param parent: The parent of the state that we're at
         :return: Nothing
         """
-        heapq.heappush(self.frontier, (cost, state))
+        heapq.heappush(self.frontier, (cost + self.problem.estimate(state), state))
         self.path[state] = parent
         self.cost[state] = cost
 
     def get(self):
         """
         Gets the top item from the priority queue (frontier) and returns it.
+        The state is marked as closed, so it will never be returned again.
         :return: The top item of the priority queue
         """
-        return heapq.heappop(self.frontier)[1]
+        if len(self.frontier) > self.max_frontier:
+            self.max_frontier = len(self.frontier)
+        state = heapq.heappop(self.frontier)[1]
+        self.closed.add(state)
+        return state
 
     def empty(self):
         """
         Checks to see if the priority queue (frontier) is empty.
+          -- add() never removes the older, more expensive entry of a state (lazy deletion), so any
+             entry for a closed state at the top of the frontier is stale and is dropped here
         :return: True if empty; otherwise False.
         """
+        while self.frontier and self.frontier[0][1] in self.closed:
+            heapq.heappop(self.frontier)
+            self.stale_pops += 1
         return not self.frontier
 
 
@@ -113,55 +236,244 @@ class AStar:
         """
         Performs A* Search. This search is based upon the searches from the text
         Note: Based off of depth uniform search from text.
+              The frontier is ordered by cost + problem.estimate(state), so with the default
+              manhattan heuristic it only expands the nodes that can be on a cheapest path.
 
         :param problem: An initialized object of type Problem
-        :return: Quadruple:
+        :return: Quintuple:
                     bool:             - A boolean value - true if search reached goal successfully, false if not
                     path:             - The path to the goal - returns None if search failed
                                             -NOTE: The path is rebuilt inside of this search (into the correct order)
                     cost:             - The cost to get to the goal - returns None if search failed
                     runtime:          - Total time that the function ran for
+                    stats:            - Dictionary of search statistics:
+                                            nodes_expanded - number of states taken off of the frontier
+                                            stale_pops     - outdated frontier entries that were skipped
+                                            pops, pushes   - entries taken off of / put on the frontier
+                                            max_frontier   - the most entries on the frontier at once
+                                          (an initial state that isn't in the graph only has the first two)
         """
-        start_time = time.clock()                   # Time that the function started at
+        if isinstance(problem.graph, CompactGraph):
+            return AStar.search_compact(problem)
+
+        start_time = time.perf_counter()                   # Time that the function started at
+        stats = {'nodes_expanded': 0, 'stale_pops': 0}
         if problem.initial_state in problem.graph:  # Ensures that initial state is valid
             queue = StateQueue(problem)
 
             while not queue.empty():
                 current_state = queue.get()
+                stats['nodes_expanded'] += 1
 
                 # GOAL:
                 if problem.is_goal(current_state):
                     # making things more readable
                     cost = queue.cost[current_state]
-                    runtime = time.clock() - start_time
-                    path = AStar.make_path(queue.path, problem)
+                    runtime = time.perf_counter() - start_time
+                    path = AStar.make_path(queue.path, problem, current_state)
+                    stats['stale_pops'] = queue.stale_pops
+                    frontier_stats(stats, len(queue.frontier), queue.max_frontier)
 
-                    return True, path, cost, runtime
+                    return True, path, cost, runtime, stats
 
                 else:
-                    for next_state in problem.successors(current_state):
+                    AStar.expand(problem, queue, current_state)
+
+            stats['stale_pops'] = queue.stale_pops
+            frontier_stats(stats, len(queue.frontier), queue.max_frontier)
+
+        runtime = time.perf_counter() - start_time
+        return False, None, None, runtime, stats
+
+    @staticmethod
+    def search_compact(problem):
+        """
+        The same search as AStar.search, for problems on a CompactGraph.
+        It works on node indices and reads the edges straight out of the CSR arrays of the graph
+        instead of going through StateQueue, which avoids most of the per-edge overhead.
+
+        :param problem: An initialized object of type Problem (or MultiGoalProblem) on a CompactGraph
+        :return: the same quintuple as AStar.search
+        """
+        start_time = time.perf_counter()
+        stats = {'nodes_expanded': 0, 'stale_pops': 0}
+        graph = problem.graph
+        if problem.initial_state in graph:
+            node_list, offsets, neighbours, weights = graph.node_list, graph.offsets, graph.neighbours, graph.weights
+            estimate = problem.estimate
+            start = graph.index[problem.initial_state]
+            frontier = [(estimate(problem.initial_state), start)]
+            cost = {start: 0}
+            parent = {start: -1}
+            closed = set()
+            max_frontier = 1
+
+            while frontier:
+                if len(frontier) > max_frontier:
+                    max_frontier = len(frontier)
+                i = heapq.heappop(frontier)[1]
+                if i in closed:
+                    stats['stale_pops'] += 1
+                    continue
+                closed.add(i)
+                stats['nodes_expanded'] += 1
+
+                # GOAL:
+                if problem.is_goal(node_list[i]):
+                    path = []
+                    j = i
+                    while j != -1:
+                        path.append(node_list[j])
+                        j = parent[j]
+                    path.reverse()
+                    frontier_stats(stats, len(frontier), max_frontier)
+                    return True, path, cost[i], time.perf_counter() - start_time, stats
+
+                cost_so_far = cost[i]
+                for k in range(offsets[i], offsets[i + 1]):
+                    j = neighbours[k]
+                    if j in closed:
+                        continue
+                    next_cost = cost_so_far + weights[k]
+                    if j not in cost or next_cost < cost[j]:
+                        cost[j] = next_cost
+                        parent[j] = i
+                        heapq.heappush(frontier, (next_cost + estimate(node_list[j]), j))
+            frontier_stats(stats, 0, max_frontier)
+
+        return False, None, None, time.perf_counter() - start_time, stats
+
+    @staticmethod
+    def search_nearest(problem):
+        """
+        Searches for whichever goal of a MultiGoalProblem is the cheapest to get to.
+        The search stops as soon as the first goal is taken off of the frontier.
+
+        :param problem: An initialized object of type MultiGoalProblem
+        :return: Sextuple:
+                    bool:             - A boolean value - true if search reached a goal successfully, false if not
+                    goal:             - The goal that was reached - returns None if search failed
+                    path, cost, runtime, stats: - The same as AStar.search
+        """
+        search = AStar.search(problem)
+        goal = search[1][-1] if search[0] else None
+        return search[0], goal, search[1], search[2], search[3], search[4]
 
-                        # HEURISTIC:
-                        next_state_cost = problem.graph.get_edge_data(current_state, next_state)['weight']
-                        cost = queue.cost[current_state] + next_state_cost
+    @staticmethod
+    def search_bidirectional(problem):
+        """
+        Performs A* from both ends at once: forward from the initial state towards the goal, and backward
+        from the goal towards the initial state (the maps are undirected, so the edges are the same both ways).
+        The side with the smaller frontier is expanded next. Every edge that reaches a state the other side
+        has already seen is a complete path, and the cheapest one so far is kept as mu.
+          -- Both sides share one estimate, half of (estimate to the goal - estimate to the initial state),
+             added going forward and taken away going backward. It is consistent both ways when the heuristic is.
+          -- Stopping: with that estimate, the priorities of a state on both sides add up to the cost of the
+             cheapest path through it, so once the two smallest priorities add up to mu, no path that hasn't
+             been seen yet can be cheaper than mu.
+
+        :param problem: An initialized object of type Problem
+        :return: the same quintuple as AStar.search
+        """
+        start_time = time.perf_counter()
+        stats = {'nodes_expanded': 0, 'stale_pops': 0}
+        start, goal, graph = problem.initial_state, problem.goal_state, problem.graph
+        if start not in graph or goal not in graph:
+            return False, None, None, time.perf_counter() - start_time, stats
+        if start == goal:
+            return True, [start], 0, time.perf_counter() - start_time, stats
+
+        heuristic = problem.heuristic
+        forward_estimate = lambda state: (heuristic(state, goal, graph) - heuristic(state, start, graph)) / 2.0
+        backward_estimate = lambda state: -forward_estimate(state)
+        # one [frontier, cost, parent, closed, estimate] per direction
+        sides = ([[(forward_estimate(start), start)], {start: 0}, {start: None}, set(), forward_estimate],
+                 [[(backward_estimate(goal), goal)], {goal: 0}, {goal: None}, set(), backward_estimate])
+        best_cost = float("inf")
+        meeting_state = None
+        max_frontier = 2
+
+        while True:
+            for frontier, cost, parent, closed, estimate in sides:
+                while frontier and frontier[0][1] in closed:
+                    heapq.heappop(frontier)
+                    stats['stale_pops'] += 1
+            if not sides[0][0] or not sides[1][0]:
+                break
+            if sides[0][0][0][0] + sides[1][0][0][0] >= best_cost:
+                break
+
+            if len(sides[0][0]) + len(sides[1][0]) > max_frontier:
+                max_frontier = len(sides[0][0]) + len(sides[1][0])
+            side, other = (sides[0], sides[1]) if len(sides[0][0]) <= len(sides[1][0]) else (sides[1], sides[0])
+            frontier, cost, parent, closed, estimate = side
+            other_cost = other[1]
+            current_state = heapq.heappop(frontier)[1]
+            closed.add(current_state)
+            stats['nodes_expanded'] += 1
+
+            for next_state, next_state_cost in problem.weighted_successors(current_state):
+                if next_state in closed:
+                    continue
+                next_cost = cost[current_state] + next_state_cost
+                if next_state not in cost or next_cost < cost[next_state]:
+                    cost[next_state] = next_cost
+                    parent[next_state] = current_state
+                    heapq.heappush(frontier, (next_cost + estimate(next_state), next_state))
+                if next_state in other_cost and cost[next_state] + other_cost[next_state] < best_cost:
+                    best_cost = cost[next_state] + other_cost[next_state]
+                    meeting_state = next_state
+
+        frontier_stats(stats, len(sides[0][0]) + len(sides[1][0]), max_frontier)
+        if meeting_state is None:
+            return False, None, None, time.perf_counter() - start_time, stats
+
+        path = []
+        state = meeting_state
+        while state is not None:
+            path.append(state)
+            state = sides[0][2][state]
+        path.reverse()
+        state = sides[1][2][meeting_state]
+        while state is not None:
+            path.append(state)
+            state = sides[1][2][state]
+        return True, path, best_cost, time.perf_counter() - start_time, stats
+
+    @staticmethod
+    def expand(problem, queue, current_state):
+        """
+        Relaxes every edge leaving current_state, adding the successors that got cheaper to the queue.
+        Closed successors are skipped: the heuristics above are consistent, so a closed state
+        already has its cheapest cost and expanding it again could never improve anything.
+
+        :param problem:               Object of type Problem - The problem being searched
+        :param queue:                 The StateQueue of the search
+        :param current_state:         The state that was just taken off of the frontier
+        :return:                      Nothing
+        """
+        for next_state, next_state_cost in problem.weighted_successors(current_state):
+            if next_state in queue.closed:
+                continue
 
-                        # if next_state hasn't been explored or costs less that the previous cost
-                        if next_state not in queue.path or cost < queue.cost[next_state]:
-                            queue.add(cost, next_state, current_state)
+            # COST: (the heuristic estimate is added to the priority by the queue)
+            cost = queue.cost[current_state] + next_state_cost
 
-        runtime = time.clock() - start_time
-        return False, None, None, runtime
+            # if next_state hasn't been explored or costs less that the previous cost
+            if next_state not in queue.path or cost < queue.cost[next_state]:
+                queue.add(cost, next_state, current_state)
 
     @staticmethod
-    def make_path(path_dictionary, problem):
+    def make_path(path_dictionary, problem, goal_state=None):
         """
         Rebuilds the path that search returns so that it is the correct order (from initial_state to goal_state)
 
         :param problem:               Object of type Problem - The original problem
         :param path_dictionary:       The path that A* recorded
+        :param goal_state:            The goal that was reached (defaults to the goal of the problem)
         :return:                      A path that is in the correct order
         """
-        current_state = problem.goal_state
+        current_state = problem.goal_state if goal_state is None else goal_state
         path = [current_state]                              # Set the start of the path to be that of the goal state
         while current_state != problem.initial_state:
             current_state = path_dictionary[current_state]  # Get parent from dictionary
@@ -170,13 +482,24 @@ class AStar:
         return path
 
 
+class BidirectionalAStar(AStar):
+    """
+    AStar, with every single goal search done by AStar.search_bidirectional.
+    It can be used anywhere that AStar can (as a router, or behind a PathCache or a DistanceTable).
+    """
+
+    @staticmethod
+    def search(problem):
+        return AStar.search_bidirectional(problem)
+
+
 def test_astar():
     # CREATE GRAPH:
-    # Warning: Takes around eight seconds to create graph @ size 500.
-    # Warning: Will run out of memory @ around ~2000 dimension
-    make_graph_time = time.clock()
+    # Warning: The networkx graph takes around a second to build @ size 500.
+    # Warning: Use Map.makeGrid() with CompactGraph.from_grid() @ around ~2000 dimension and up
+    make_graph_time = time.perf_counter()
     graph = makeMap(50, 50, .45)
-    make_graph_time = time.clock() - make_graph_time
+    make_graph_time = time.perf_counter() - make_graph_time
 
     # Testing A Star
     # STATES:
@@ -192,6 +515,7 @@ def test_astar():
         print(("Total time to create graph: " + str(make_graph_time)))
         print(("Total time to perform search: " + str(search_path[3])))
         print(("Total cost of path:" + str(search_path[2])))
+        print(("Nodes expanded: " + str(search_path[4]['nodes_expanded'])))
         # draw_path(problem, search_path[1])
         # draw_paths(graph)
 
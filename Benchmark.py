@@ -0,0 +1,168 @@
+"""
+Runs Simulation.py headless over a grid of scenarios and writes what every run measured to CSV and JSON.
+Every scenario is seeded, so the same command line always runs the same scenarios and the results
+of two versions of the code can be compared directly.
+
+  python Benchmark.py --sizes 50x25 75x33 --trucks 5 10 --packages 20 50 --repeats 3 --output baseline
+"""
+
+import argparse
+import contextlib
+import csv
+import itertools
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from Scenario import Scenario
+import Simulation as settings
+from Simulation import Simulation, SEARCH_ALGORITHMS, DISPATCH_METHODS
+
+FIELDS = ['map_width', 'map_height', 'map_noise', 'number_of_trucks', 'number_of_packages', 'number_of_garages',
+          'seed', 'repeat', 'search_algorithm', 'use_distance_table', 'event_driven', 'dispatch', 'package_workers',
+          'iterations', 'simulated_time', 'time_total', 'time_graph', 'time_router', 'time_packages',
+          'time_searching', 'time_simulation', 'nodes_expanded', 'router_nodes_expanded', 'peak_memory_kb',
+          'total_distance', 'packages_delivered']
+
+
+def parse_size(size):
+    """
+    :param size: a map size like '75x33'
+    :return: the width and the height
+    """
+    width, height = size.lower().split('x')
+    return int(width), int(height)
+
+
+def scenarios(sizes, noises, trucks, packages, garages, repeats, seed):
+    """
+    Every combination of the settings, repeated with seeds seed, seed + 1, ...
+    :return: a generator of (repeat, scenario) pairs
+    """
+    for (size, noise, n, k, g) in itertools.product(sizes, noises, trucks, packages, garages):
+        for repeat in range(repeats):
+            width, height = parse_size(size)
+            yield repeat, Scenario(width, height, noise, n, k, g, seed=seed + repeat)
+
+
+def run(scenario, directory, timeout, search_algorithm='astar', use_distance_table=True,
+        event_driven=settings.event_driven, dispatch=settings.dispatch, package_workers=settings.package_workers):
+    """
+    Runs one scenario in its own process, so every run starts from a clean interpreter
+    :param scenario: the scenario to run
+    :param directory: where the scenario and results files go
+    :param timeout: seconds before the run is given up on
+    :param search_algorithm: the search that the simulation uses (see Simulation.SEARCH_ALGORITHMS)
+    :param use_distance_table: False runs every query through the search itself
+    :param event_driven: run the event engine instead of the tick engine
+    :param dispatch: how packages are handed out (see Simulation.DISPATCH_METHODS)
+    :param package_workers: the processes that search for the package paths (see Simulation.package_workers)
+    :return: the measurements written by Simulation.py, or None if the run failed
+    """
+    scenario_file = os.path.join(directory, 'scenario.json')
+    results_file = os.path.join(directory, 'results.json')
+    scenario.save(scenario_file)
+    if os.path.exists(results_file):
+        os.remove(results_file)
+
+    simulation = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Simulation.py')
+    command = [sys.executable, simulation, '--headless', '--scenario', scenario_file, '--results', results_file,
+               '--search', search_algorithm, '--dispatch', dispatch, '--package-workers', str(package_workers),
+               '--event-driven' if event_driven else '--no-event-driven']
+    if not use_distance_table:
+        command.append('--no-distance-table')
+    try:
+        subprocess.check_call(command, stdout=subprocess.DEVNULL, timeout=timeout)
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+        print("Run failed: " + str(e))
+        return None
+    with open(results_file) as f:
+        return json.load(f)
+
+
+def run_in_process(scenario, search_algorithm='astar', use_distance_table=True,
+                   event_driven=settings.event_driven, dispatch=settings.dispatch,
+                   package_workers=settings.package_workers):
+    """
+    Runs one scenario in this process -- no start up cost, but peak_memory_kb is the peak of the whole benchmark
+    :param scenario: the scenario to run
+    :param search_algorithm: the search that the simulation uses (see Simulation.SEARCH_ALGORITHMS)
+    :param use_distance_table: False runs every query through the search itself
+    :param event_driven: run the event engine instead of the tick engine
+    :param dispatch: how packages are handed out (see Simulation.DISPATCH_METHODS)
+    :param package_workers: the processes that search for the package paths (see Simulation.package_workers)
+    :return: the measurements of the run
+    """
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        simulation = Simulation(scenario, use_distance_table, settings.path_cache_size, settings.use_compact_graph,
+                                package_workers=package_workers, event_driven=event_driven, dispatch=dispatch,
+                                search_algorithm=search_algorithm)
+        simulation.run()
+    return simulation.results()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks the simulation over a grid of N, K and M.')
+    parser.add_argument('--sizes', nargs='+', default=['75x33'], help='map sizes, e.g. 50x25 75x33')
+    parser.add_argument('--noise', nargs='+', type=float, default=[.4])
+    parser.add_argument('--trucks', nargs='+', type=int, default=[7])
+    parser.add_argument('--packages', nargs='+', type=int, default=[24])
+    parser.add_argument('--garages', nargs='+', type=int, default=[4])
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--search', nargs='+', choices=sorted(SEARCH_ALGORITHMS), default=['astar'],
+                        help='runs every scenario with each of these searches')
+    parser.add_argument('--no-distance-table', action='store_true',
+                        help='runs every query through the search (to compare searches like ch and astar)')
+    parser.add_argument('--event-driven', dest='event_driven', action='store_true', default=settings.event_driven,
+                        help='runs the event engine (the default follows Simulation.event_driven)')
+    parser.add_argument('--no-event-driven', dest='event_driven', action='store_false',
+                        help='runs the tick engine')
+    parser.add_argument('--dispatch', choices=DISPATCH_METHODS, default=settings.dispatch,
+                        help='how packages are handed out (the default follows Simulation.dispatch)')
+    parser.add_argument('--package-workers', type=int, default=settings.package_workers,
+                        help='processes that search for the package paths, without a distance table '
+                             '(the default follows Simulation.package_workers)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first repeat of every configuration')
+    parser.add_argument('--timeout', type=float, default=None, help='seconds before a run is given up on')
+    parser.add_argument('--in-process', action='store_true', help='runs every scenario in this process')
+    parser.add_argument('--output', default='benchmark', help='writes OUTPUT.csv and OUTPUT.json')
+    arguments = parser.parse_args()
+
+    rows = []
+    directory = tempfile.mkdtemp()
+    try:
+        for repeat, scenario in scenarios(arguments.sizes, arguments.noise, arguments.trucks, arguments.packages,
+                                          arguments.garages, arguments.repeats, arguments.seed):
+            for search_algorithm in arguments.search:
+                if arguments.in_process:
+                    results = run_in_process(scenario, search_algorithm, not arguments.no_distance_table,
+                                             arguments.event_driven, arguments.dispatch, arguments.package_workers)
+                else:
+                    results = run(scenario, directory, arguments.timeout, search_algorithm,
+                                  not arguments.no_distance_table, arguments.event_driven, arguments.dispatch,
+                                  arguments.package_workers)
+                if results is None:
+                    continue
+                row = results.pop('scenario')
+                row.update(results)
+                row['repeat'] = repeat
+                rows.append(row)
+                print("(" + str(scenario.map_width) + ", " + str(scenario.map_height) + ") N=" +
+                      str(scenario.number_of_trucks) + " K=" + str(scenario.number_of_packages) +
+                      " seed=" + str(scenario.seed) + " " + search_algorithm + ": " +
+                      "{0:.3f}".format(results['time_total']) + "s")
+    finally:
+        shutil.rmtree(directory)
+
+    with open(arguments.output + '.json', 'w') as f:
+        json.dump(rows, f, indent=4, sort_keys=True)
+    with open(arguments.output + '.csv', 'w', newline='') as f:
+        writer = csv.DictWriter(f, FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+import sys
+from array import array
+import numpy
+
+
+class CompactGraph:
+    """
+    The CompactGraph class is a read-only copy of a map that is small and quick to search.
+    Nodes are numbered 0..M-1, the adjacency is stored in compressed sparse row (CSR) form:
+      the neighbours of node i are neighbours[offsets[i]:offsets[i + 1]],
+      and the weights of those edges are weights[offsets[i]:offsets[i + 1]]
+    Every search in AStar can run on it directly; the networkx graph is still used for drawing.
+    """
+
+    def __init__(self, nodes, edges):
+        """
+        Builds the graph
+        :param nodes: the (x, y) nodes of the graph
+        :param edges: (node, node, weight) triples -- the graph is undirected, so each edge is given once
+        """
+        self.node_list = list(nodes)
+        self.index = {node: i for i, node in enumerate(self.node_list)}    # (x, y) -> node index
+        self.xs = array('i', [node[0] for node in self.node_list])
+        self.ys = array('i', [node[1] for node in self.node_list])
+
+        adjacency = [[] for _ in self.node_list]
+        for (u, v, w) in edges:
+            adjacency[self.index[u]].append((self.index[v], w))
+            adjacency[self.index[v]].append((self.index[u], w))
+
+        self.offsets = array('l', [0])
+        self.neighbours = array('l')
+        self.weights = array('d')
+        for edges_of_node in adjacency:
+            for (j, w) in edges_of_node:
+                self.neighbours.append(j)
+                self.weights.append(w)
+            self.offsets.append(len(self.neighbours))
+
+        # Same place as a networkx graph keeps its attributes (see Map.min_edge_weight)
+        self.graph = {'min_weight': min(self.weights) if self.weights else 1}
+
+    @staticmethod
+    def from_networkx(g):
+        """
+        Copies a graph that was made by Map.makeMap
+        :param g: a networkx graph with a 'weight' on every edge
+        :return: the compact copy of the graph
+        """
+        return CompactGraph(g.nodes(), ((u, v, d['weight']) for (u, v, d) in g.edges(data=True)))
+
+    @staticmethod
+    def from_grid(nodes, across, down):
+        """
+        Builds the graph straight from the arrays of Map.makeGrid, without making a networkx graph first
+        :param nodes: m x n bool array, True where node (i, j) is in the map
+        :param across: (m-1) x n array of the weights of the edges (i, j)-(i+1, j), 0 where there is no edge
+        :param down: m x (n-1) array of the weights of the edges (i, j)-(i, j+1), 0 where there is no edge
+        :return: the compact graph of the map
+        """
+        size = int(nodes.sum())
+        coordinates = numpy.argwhere(nodes)
+        index = numpy.full(nodes.shape, -1, dtype='l')
+        index[nodes] = numpy.arange(size)
+
+        # both directions of every edge, sorted by the node they leave from
+        sources = numpy.concatenate((index[:-1, :][across > 0], index[:, :-1][down > 0]))
+        targets = numpy.concatenate((index[1:, :][across > 0], index[:, 1:][down > 0]))
+        weights = numpy.concatenate((across[across > 0], down[down > 0])).astype(numpy.float64)
+        sources, targets = numpy.concatenate((sources, targets)), numpy.concatenate((targets, sources))
+        weights = numpy.concatenate((weights, weights))
+        order = numpy.argsort(sources, kind='mergesort')
+        counts = numpy.bincount(sources, minlength=size)
+
+        g = CompactGraph([], [])
+        g.node_list = [tuple(node) for node in coordinates.tolist()]
+        g.index = {node: i for i, node in enumerate(g.node_list)}
+        g.xs.frombytes(coordinates[:, 0].astype('i').tobytes())
+        g.ys.frombytes(coordinates[:, 1].astype('i').tobytes())
+        g.offsets.frombytes(numpy.cumsum(counts).astype('l').tobytes())
+        g.neighbours.frombytes(targets[order].astype('l').tobytes())
+        g.weights.frombytes(weights[order].tobytes())
+        g.graph['min_weight'] = weights.min().item() if weights.size else 1
+        return g
+
+    def __contains__(self, node):
+        return node in self.index
+
+    def __len__(self):
+        return len(self.node_list)
+
+    def __iter__(self):
+        return iter(self.node_list)
+
+    def nodes(self):
+        """
+        :return: a list of all of the nodes
+        """
+        return list(self.node_list)
+
+    def number_of_nodes(self):
+        return len(self.node_list)
+
+    def coordinates(self, i):
+        """
+        :param i: a node index
+        :return: the (x, y) node with that index
+        """
+        return self.node_list[i]
+
+    def neighbors(self, node):
+        """
+        :param node: an (x, y) node
+        :return: a list of the nodes next to it
+        """
+        i = self.index[node]
+        return [self.node_list[j] for j in self.neighbours[self.offsets[i]:self.offsets[i + 1]]]
+
+    def weighted_neighbours(self, node):
+        """
+        :param node: an (x, y) node
+        :return: (neighbour, weight) pairs for every edge of the node
+        """
+        i = self.index[node]
+        start, end = self.offsets[i], self.offsets[i + 1]
+        node_list = self.node_list
+        return zip([node_list[j] for j in self.neighbours[start:end]], self.weights[start:end])
+
+    def memory_usage(self):
+        """
+        Roughly how much memory the graph takes (not counting the node tuples)
+        :return: the size of the graph in bytes
+        """
+        return sum(sys.getsizeof(part) for part in (self.node_list, self.index, self.xs, self.ys,
+                                                    self.offsets, self.neighbours, self.weights))
@@ -0,0 +1,281 @@
+import heapq
+import time
+from AStar import AStar
+from CompactGraph import CompactGraph
+
+
+class ContractionHierarchy:
+    """
+    The ContractionHierarchy class is an index of the map for answering many point to point queries fast.
+    Building it contracts the nodes one at a time, least important first: a node is taken out of the graph,
+    and wherever the cheapest path between two of its neighbours went through it, a shortcut edge between
+    those neighbours is added (remembering the node it skips, so the path can be unpacked later).
+    Every node then only needs its edges to nodes that were contracted after it (upward edges), and a query
+    is two small Dijkstra searches that only go upward, one from each end, that meet at the top.
+    It answers search(problem) just like AStar, with the whole path unpacked.
+    """
+
+    def __init__(self, graph, witness_limit=60, fallback=AStar):
+        """
+        Builds the hierarchy
+        :param graph: the graph (networkx or CompactGraph)
+        :param witness_limit: the most nodes a witness search settles before it gives up and the shortcut is
+                              added anyway (extra shortcuts never give a wrong answer, only a bigger index)
+        :param fallback: anything with search(problem) and search_nearest(problem) methods, for queries
+                         on nodes that aren't in the graph
+        """
+        start_time = time.perf_counter()
+        compact = graph if isinstance(graph, CompactGraph) else CompactGraph.from_networkx(graph)
+        self.nodes = compact.node_list
+        self.index = compact.index
+        self.witness_limit = witness_limit
+        self.fallback = fallback
+        self.up = []                # up[i] is the (j, cost) edges from node i to nodes contracted after it
+        self.middle = {}            # (i, j) with i < j -> the node that the shortcut i-j skips
+        self.rank = []
+        self.shortcuts = 0
+
+        # the graph that is left, as node -> {neighbour: cost}
+        adjacency = [dict() for _ in self.nodes]
+        for i in range(len(self.nodes)):
+            for k in range(compact.offsets[i], compact.offsets[i + 1]):
+                j, weight = compact.neighbours[k], compact.weights[k]
+                if weight < adjacency[i].get(j, float("inf")):
+                    adjacency[i][j] = weight
+        self.contract_all(adjacency)
+        self.build_time = time.perf_counter() - start_time
+
+    def witness(self, adjacency, source, skipped, targets, max_cost):
+        """
+        Searches for paths from source to the targets that don't go through skipped
+        :param adjacency: the graph that is left
+        :param source: the start node
+        :param skipped: the node that is being contracted
+        :param targets: the nodes to find
+        :param max_cost: paths that cost more than this don't matter
+        :return: the cost of every node that was settled
+        """
+        targets = set(targets)
+        frontier = [(0, source)]
+        cost = {source: 0}
+        settled = {}
+        while frontier and targets and len(settled) < self.witness_limit:
+            cost_so_far, i = heapq.heappop(frontier)
+            if i in settled:
+                continue
+            if cost_so_far > max_cost:
+                break
+            settled[i] = cost_so_far
+            targets.discard(i)
+            for j, weight in adjacency[i].items():
+                if j == skipped or j in settled:
+                    continue
+                if cost_so_far + weight < cost.get(j, float("inf")):
+                    cost[j] = cost_so_far + weight
+                    heapq.heappush(frontier, (cost[j], j))
+        return cost
+
+    def needed_shortcuts(self, adjacency, v):
+        """
+        The shortcuts that contracting v would need
+        :param adjacency: the graph that is left
+        :param v: the node
+        :return: a list of (u, w, cost) shortcuts
+        """
+        neighbours = list(adjacency[v].items())
+        shortcuts = []
+        for n, (u, cost_u) in enumerate(neighbours):
+            others = neighbours[n + 1:]
+            if not others:
+                continue
+            max_cost = cost_u + max(cost_w for w, cost_w in others)
+            cost = self.witness(adjacency, u, v, [w for w, cost_w in others], max_cost)
+            for w, cost_w in others:
+                if cost.get(w, float("inf")) > cost_u + cost_w:
+                    shortcuts.append((u, w, cost_u + cost_w))
+        return shortcuts
+
+    def contract_all(self, adjacency):
+        """
+        Contracts every node, in order of edge difference (shortcuts added - edges taken away)
+        plus the number of neighbours already contracted, so that the hierarchy stays even.
+        Priorities change as the graph shrinks, so a node's priority is worked out again when it comes up,
+        and it goes back in the queue if it is no longer the smallest.
+        :param adjacency: the graph
+        :return: N/A
+        """
+        size = len(self.nodes)
+        self.up = [[] for _ in range(size)]
+        self.rank = [0] * size
+        contracted_neighbours = [0] * size
+
+        def priority(v):
+            return len(self.needed_shortcuts(adjacency, v)) - len(adjacency[v]) + contracted_neighbours[v]
+
+        queue = [(priority(v), v) for v in range(size)]
+        heapq.heapify(queue)
+        order = 0
+        while queue:
+            v = heapq.heappop(queue)[1]
+            current = priority(v)
+            if queue and current > queue[0][0]:
+                heapq.heappush(queue, (current, v))
+                continue
+
+            for u, w, cost in self.needed_shortcuts(adjacency, v):
+                if cost < adjacency[u].get(w, float("inf")):
+                    adjacency[u][w] = adjacency[w][u] = cost
+                    self.middle[(min(u, w), max(u, w))] = v
+                    self.shortcuts += 1
+            self.rank[v] = order
+            order += 1
+            self.up[v] = list(adjacency[v].items())
+            for u in adjacency[v]:
+                del adjacency[u][v]
+                contracted_neighbours[u] += 1
+            adjacency[v] = {}
+
+    def query(self, source, destination):
+        """
+        The upward searches from both ends, until neither can find anything cheaper than the best meeting node
+        :param source: the index of the start node
+        :param destination: the index of the goal node
+        :return: the cost, the meeting node, the parents of both searches and the number of nodes settled
+        """
+        sides = (([(0, source)], {source: 0}, {source: -1}, set()),
+                 ([(0, destination)], {destination: 0}, {destination: -1}, set()))
+        best_cost = float("inf")
+        meeting = -1
+        settled = 0
+        while sides[0][0] or sides[1][0]:
+            for (frontier, cost, parent, closed), other in ((sides[0], sides[1]), (sides[1], sides[0])):
+                if not frontier:
+                    continue
+                cost_so_far, i = heapq.heappop(frontier)
+                if i in closed:
+                    continue
+                if cost_so_far >= best_cost:
+                    del frontier[:]
+                    continue
+                closed.add(i)
+                settled += 1
+                if i in other[1] and cost_so_far + other[1][i] < best_cost:
+                    best_cost = cost_so_far + other[1][i]
+                    meeting = i
+                for j, weight in self.up[i]:
+                    if cost_so_far + weight < cost.get(j, float("inf")):
+                        cost[j] = cost_so_far + weight
+                        parent[j] = i
+                        heapq.heappush(frontier, (cost[j], j))
+                        if j in other[1] and cost[j] + other[1][j] < best_cost:
+                            best_cost = cost[j] + other[1][j]
+                            meeting = j
+        return best_cost, meeting, sides[0][2], sides[1][2], settled
+
+    def unpack(self, i, j):
+        """
+        Replaces an edge of the hierarchy by the edges of the map that it stands for
+        :param i: one end of the edge
+        :param j: the other end
+        :return: the node indices from i to j
+        """
+        path = [i]
+        stack = [j]
+        while stack:
+            top = stack[-1]
+            middle = self.middle.get((min(path[-1], top), max(path[-1], top)))
+            if middle is None:
+                path.append(stack.pop())
+            else:
+                stack.append(middle)
+        return path
+
+    def distance(self, source, destination):
+        """
+        The cost of the cheapest path between two nodes
+        :param source: the start node
+        :param destination: the goal node
+        :return: the cost (inf if there is no path)
+        """
+        return self.query(self.index[source], self.index[destination])[0]
+
+    def path(self, source, destination):
+        """
+        The cheapest path between two nodes, with every node of the map on it
+        :param source: the start node
+        :param destination: the goal node
+        :return: the path and its cost, or (None, inf) if there isn't one
+        """
+        cost, meeting, forward, backward, settled = self.query(self.index[source], self.index[destination])
+        return self.make_path(meeting, forward, backward), cost
+
+    def make_path(self, meeting, forward, backward):
+        """
+        Rebuilds the path of a query and unpacks all of its shortcuts
+        :param meeting: the meeting node of the query
+        :param forward: the parents of the search from the start
+        :param backward: the parents of the search from the goal
+        :return: the nodes of the path, or None if the query didn't find one
+        """
+        if meeting == -1:
+            return None
+        up = [meeting]
+        while forward[up[-1]] != -1:
+            up.append(forward[up[-1]])
+        up.reverse()
+        while backward[up[-1]] != -1:
+            up.append(backward[up[-1]])
+
+        path = [up[0]]
+        for i, j in zip(up, up[1:]):
+            path += self.unpack(i, j)[1:]
+        return [self.nodes[i] for i in path]
+
+    def search(self, problem):
+        """
+        Answers the problem with the hierarchy, or with the fallback if its nodes aren't in the graph
+        :param problem: An initialized object of type Problem
+        :return: the same quintuple as AStar.search -- nodes_expanded counts the nodes settled by the query
+        """
+        if problem.initial_state not in self.index or problem.goal_state not in self.index:
+            return self.fallback.search(problem)
+
+        start_time = time.perf_counter()
+        source, destination = self.index[problem.initial_state], self.index[problem.goal_state]
+        cost, meeting, forward, backward, settled = self.query(source, destination)
+        stats = {'nodes_expanded': settled, 'stale_pops': 0}
+        if meeting == -1:
+            return False, None, None, time.perf_counter() - start_time, stats
+        return True, self.make_path(meeting, forward, backward), cost, time.perf_counter() - start_time, stats
+
+    def search_nearest(self, problem):
+        """
+        Finds the closest goal of a MultiGoalProblem with one query per goal
+        :param problem: An initialized object of type MultiGoalProblem
+        :return: the same sextuple as AStar.search_nearest
+        """
+        goal_states = problem.goal_states
+        if problem.initial_state not in self.index or not all(goal in self.index for goal in goal_states):
+            return self.fallback.search_nearest(problem)
+
+        start_time = time.perf_counter()
+        stats = {'nodes_expanded': 0, 'stale_pops': 0}
+        source = self.index[problem.initial_state]
+        best = None
+        for goal in sorted(goal_states, key=lambda state: self.index[state]):
+            query = self.query(source, self.index[goal])
+            stats['nodes_expanded'] += query[4]
+            if query[1] != -1 and (best is None or query[0] < best[1][0]):
+                best = goal, query
+        if best is None:
+            return False, None, None, None, time.perf_counter() - start_time, stats
+        goal, (cost, meeting, forward, backward, settled) = best
+        return True, goal, self.make_path(meeting, forward, backward), cost, time.perf_counter() - start_time, stats
+
+    def memory_usage(self):
+        """
+        Roughly how much memory the index takes (not counting the node tuples)
+        :return: the size in bytes
+        """
+        edges = sum(len(edges) for edges in self.up)
+        return 8 * len(self.rank) + 72 * edges + 100 * len(self.middle)
@@ -0,0 +1,327 @@
+import heapq
+import time
+import numpy
+from CompactGraph import CompactGraph
+from DistanceTable import DistanceTable
+
+
+def hungarian(cost):
+    """
+    Solves the assignment problem: matches rows to columns so that the total cost is as small as possible.
+    This is the O(n^2 m) shortest augmenting path version of the Hungarian algorithm, with the scan over
+    the columns done by numpy. Rectangular matrices are fine: min(n, m) pairs are matched.
+
+    :param cost: n x m matrix of costs (inf where a row can't be matched with a column)
+    :return: a list of (row, column) pairs, without the pairs that cost inf
+    """
+    cost = numpy.array(cost, dtype=float)
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n, m = cost.shape
+    if n == 0:
+        return []
+
+    # inf would break the potentials, so anything impossible just costs more than every possible matching
+    finite = numpy.isfinite(cost)
+    big = (numpy.abs(cost[finite]).max() + 1) * (n + 1) if finite.any() else 1
+    cost[~finite] = big
+
+    u = numpy.zeros(n + 1)                  # potentials of the rows
+    v = numpy.zeros(m + 1)                  # potentials of the columns
+    p = numpy.zeros(m + 1, dtype=int)       # p[j] is the row matched with column j (1 based, 0 for none)
+    way = numpy.zeros(m + 1, dtype=int)     # the column before j on the augmenting path
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = numpy.full(m + 1, numpy.inf)
+        used = numpy.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            free = ~used[1:]
+            reduced = cost[i0 - 1] - u[i0] - v[1:]
+            better = free & (reduced < minv[1:])
+            minv[1:][better] = reduced[better]
+            way[1:][better] = j0
+            candidates = numpy.where(free, minv[1:], numpy.inf)
+            j1 = int(candidates.argmin()) + 1
+            delta = candidates[j1 - 1]
+            u[p[used]] += delta
+            v[used] -= delta
+            minv[1:][free] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    pairs = []
+    for j in range(1, m + 1):
+        if p[j] and finite[p[j] - 1, j - 1]:
+            pairs.append((j - 1, p[j] - 1) if transposed else (p[j] - 1, j - 1))
+    return sorted(pairs)
+
+
+def nearest_starts(graph, starts, goals, stats=None):
+    """
+    One Dijkstra sweep that starts from all of the starts at once, so every node is reached from the start
+    that is closest to it. The goals are handed back in the order that they are reached, which is also the
+    order of their distance to their closest start, and the sweep only goes as far as the caller asks for.
+      -- On a CompactGraph the sweep works on node indices, like AStar.search_compact
+
+    :param graph: the graph (networkx or CompactGraph)
+    :param starts: the nodes to search from
+    :param goals: the nodes to search for
+    :param stats: a dictionary whose 'nodes_expanded' is counted up by the sweep
+    :return: a generator of (goal, start, path from the start to the goal, cost) for every goal that can be reached
+    """
+    if isinstance(graph, CompactGraph):
+        node_list, offsets, neighbours, weights = graph.node_list, graph.offsets, graph.neighbours, graph.weights
+        starts = [graph.index[start] for start in set(starts) if start in graph]
+        goal_indices = set(graph.index[goal] for goal in goals if goal in graph)
+        successors = lambda i: ((neighbours[k], weights[k]) for k in range(offsets[i], offsets[i + 1]))
+    else:
+        node_list = None
+        starts = [start for start in set(starts) if start in graph]
+        goal_indices = set(goal for goal in goals if goal in graph)
+        successors = lambda state: ((next_state, data['weight']) for next_state, data in graph[state].items())
+
+    frontier = [(0, start) for start in starts]
+    heapq.heapify(frontier)
+    cost = dict.fromkeys(starts, 0)
+    parent = dict.fromkeys(starts)
+    closed = set()
+    while frontier and goal_indices:
+        cost_so_far, i = heapq.heappop(frontier)
+        if i in closed:
+            continue
+        closed.add(i)
+        if stats is not None:
+            stats['nodes_expanded'] += 1
+
+        if i in goal_indices:
+            goal_indices.remove(i)
+            path = [i]
+            while parent[path[-1]] is not None:
+                path.append(parent[path[-1]])
+            path.reverse()
+            if node_list is not None:
+                path = [node_list[j] for j in path]
+            yield path[-1], path[0], path, cost_so_far
+
+        for j, weight in successors(i):
+            if j in closed:
+                continue
+            next_cost = cost_so_far + weight
+            if j not in cost or next_cost < cost[j]:
+                cost[j] = next_cost
+                parent[j] = i
+                heapq.heappush(frontier, (next_cost, j))
+
+
+class Dispatcher:
+    """
+    The Dispatcher class hands out packages to every truck that needs one at the same time, instead of
+    letting each truck grab its closest package in turn. It builds a truck x package cost matrix from the
+    router of the simulation and solves it as an assignment problem, so the total distance that the trucks
+    drive to their packages is as small as possible and doesn't depend on the order of the trucks.
+    """
+
+    def __init__(self, simulation, method='assignment'):
+        """
+        :param simulation: the Simulation whose trucks and packages are dispatched
+        :param method: 'assignment' solves the truck x package matrix exactly (see assign_optimal),
+                       'batched' shares multi-source sweeps between the trucks (see assign_batched)
+        """
+        assert method in ('assignment', 'batched')
+        self.simulation = simulation
+        self.method = method
+
+        # Tracking
+        self.rounds = 0
+        self.searches = 0
+
+    def sweep(self, start, goals):
+        """
+        One Dijkstra sweep from start that runs until every goal is reached (nearest_starts with a single start),
+        so a whole row of the cost matrix costs one search instead of one per package
+        :param start: where the truck is
+        :param goals: the package sources
+        :return: goal -> (path from start to the goal, cost) for every goal that can be reached
+        """
+        self.searches += 1
+        start_time = time.perf_counter()
+        stats = {'nodes_expanded': 0}
+        routes = {}
+        for goal, _, path, cost in nearest_starts(self.simulation.search_graph, [start], goals, stats):
+            routes[goal] = (path, cost)
+        self.simulation.record_search('dispatch', time.perf_counter() - start_time, stats, len(routes) > 0)
+        return routes
+
+    def cost_matrix(self, trucks, packages):
+        """
+        The cost of every truck getting to every package. A row comes from the DistanceTable when it has the
+        truck and every package source in it, and otherwise from a single sweep from the truck (see sweep).
+        :param trucks: the trucks that need a package
+        :param packages: the packages that nobody is picking up yet
+        :return: numpy array of the costs, and per truck the routes of its sweep (None for a row from the table)
+        """
+        table = self.simulation.router
+        sources = set(package.source for package in packages)
+        if not isinstance(table, DistanceTable) or not all(source in table.index for source in sources):
+            table = None
+
+        cost = numpy.empty((len(trucks), len(packages)))
+        routes = []
+        for i, truck in enumerate(trucks):
+            if table is not None and truck.location in table.index:
+                row = table.distances[table.index[truck.location]]
+                cost[i] = [row[table.index[package.source]] for package in packages]
+                routes.append(None)
+            else:
+                found = self.sweep(truck.location, sources)
+                cost[i] = [found[package.source][1] if package.source in found else float("inf")
+                           for package in packages]
+                routes.append(found)
+        return cost, routes
+
+    def assign(self, trucks):
+        """
+        Gives each of the trucks a package (as long as there are packages left) all at once.
+        The packages are claimed right away, and the trucks pick up their assignment in find_next_package().
+
+        :param trucks: the trucks that need a package
+        :return: a list of the (truck, package) pairs that were made
+        """
+        if self.method == 'batched':
+            return self.assign_batched(trucks)
+        return self.assign_optimal(trucks)
+
+    def give(self, truck, package, path, cost):
+        """
+        Hands a package to a truck, and takes it off of the waiting packages
+        :return: N/A
+        """
+        truck.assignment = (package, path, cost)
+        self.simulation.claim_package(package)
+
+    def assign_optimal(self, trucks):
+        """
+        Solves the truck x package cost matrix with the Hungarian algorithm, for the smallest total distance
+        :param trucks: the trucks that need a package
+        :return: a list of the (truck, package) pairs that were made
+        """
+        # a single truck is left to the search of find_next_package, which finds the same package and stops there
+        packages = list(self.simulation.packages.values())
+        if len(trucks) < 2 or not packages:
+            return []
+        self.rounds += 1
+
+        cost, routes = self.cost_matrix(trucks, packages)
+        pairs = []
+        for i, j in hungarian(cost):
+            truck, package = trucks[i], packages[j]
+            if routes[i] is None:
+                path = self.simulation.router.path(truck.location, package.source)
+            else:
+                path = routes[i][package.source][0]
+            self.give(truck, package, path, cost[i, j])
+            pairs.append((truck, package))
+        return pairs
+
+    def assign_batched(self, trucks):
+        """
+        Hands out packages closest pair first: the truck and package source that are the closest of all get
+        matched, then the closest of what is left, and so on. The distances come from the DistanceTable when
+        it has every truck and package in it, and otherwise from shared sweeps (see sweep_batched), so there
+        is no search per truck either way.
+
+        :param trucks: the trucks that need a package
+        :return: a list of the (truck, package) pairs that were made
+        """
+        # a single truck is left to the search of find_next_package, which is the same thing
+        if len(trucks) < 2:
+            return []
+        sources = {}
+        for package in self.simulation.packages.values():
+            sources.setdefault(package.source, []).append(package)
+        if not sources:
+            return []
+
+        table = self.simulation.router
+        if isinstance(table, DistanceTable) and all(truck.location in table.index for truck in trucks) and \
+                all(source in table.index for source in sources):
+            return self.table_batched(trucks, sources, table)
+        return self.sweep_batched(trucks, sources)
+
+    def table_batched(self, trucks, sources, table):
+        """
+        Closest pair first matching, straight out of the distance table
+        :param trucks: the trucks that need a package
+        :param sources: package source -> the waiting packages at that source
+        :param table: the DistanceTable
+        :return: a list of the (truck, package) pairs that were made
+        """
+        self.rounds += 1
+        source_list = list(sources)
+        rows = [table.distances[table.index[truck.location]] for truck in trucks]
+        cost = numpy.array(rows)[:, [table.index[source] for source in source_list]]
+
+        pairs = []
+        while True:
+            i, j = numpy.unravel_index(cost.argmin(), cost.shape)
+            if not numpy.isfinite(cost[i, j]):
+                break
+            truck, source = trucks[i], source_list[j]
+            package = sources[source].pop(0)
+            self.give(truck, package, table.path(truck.location, source), cost[i, j])
+            pairs.append((truck, package))
+            cost[i, :] = numpy.inf
+            if not sources[source]:
+                cost[:, j] = numpy.inf
+        return pairs
+
+    def sweep_batched(self, trucks, sources):
+        """
+        Closest pair first matching (roughly), in rounds of a single sweep from every waiting truck at once
+        (see nearest_starts). Package sources come off of the sweep closest first, and each one goes to the
+        truck that reached it unless that truck already has a package; the trucks that are left over go again
+        in the next round, until only one is left. That is one search per round instead of one per truck.
+
+        :param trucks: the trucks that need a package
+        :param sources: package source -> the waiting packages at that source
+        :return: a list of the (truck, package) pairs that were made
+        """
+        pairs = []
+        waiting = list(trucks)
+        while len(waiting) > 1 and sources:
+            at = {}
+            for truck in waiting:
+                at.setdefault(truck.location, []).append(truck)
+            self.rounds += 1
+            self.searches += 1
+
+            start_time = time.perf_counter()
+            stats = {'nodes_expanded': 0}
+            made = 0
+            for source, start, path, cost in nearest_starts(self.simulation.search_graph, list(at), sources, stats):
+                if not at[start]:
+                    continue
+                truck = at[start].pop(0)
+                package = sources[source].pop(0)
+                if not sources[source]:
+                    del sources[source]
+                self.give(truck, package, path, cost)
+                pairs.append((truck, package))
+                made += 1
+                if made == len(waiting):
+                    break
+            self.simulation.record_search('dispatch', time.perf_counter() - start_time, stats, made > 0)
+
+            if not made:
+                break
+            waiting = [truck for truck in waiting if truck.assignment is None]
+        return pairs
@@ -0,0 +1,200 @@
+import heapq
+import sys
+import time
+from array import array
+from AStar import Problem, StateQueue, AStar, zero_heuristic
+from CompactGraph import CompactGraph
+
+
+class DistanceTable:
+    """
+    The DistanceTable class precomputes the cheapest paths between a small set of interesting nodes
+    (package sources, package destinations and garages) so that routing between them is a lookup.
+    It answers search(problem) just like AStar, and hands any other query to a fallback search.
+    """
+
+    def __init__(self, graph, nodes, fallback=AStar):
+        """
+        Builds the table with one Dijkstra sweep per interesting node
+        :param graph: the graph
+        :param nodes: the interesting nodes (duplicates are ignored)
+        :param fallback: anything with a search(problem) method, used when a query isn't in the table
+        """
+        self.graph = graph
+        self.fallback = fallback
+        self.nodes = []
+        self.index = {}             # node -> row/column of the node in the table
+        for node in nodes:
+            if node not in self.index:
+                self.index[node] = len(self.nodes)
+                self.nodes.append(node)
+
+        size = len(self.nodes)
+        self.distances = [array('d', [float("inf")]) * size for _ in range(size)]
+        self.parents = []           # parents[i] is the shortest path tree of nodes[i], cut down to its targets
+        self.nodes_expanded = 0
+
+        start_time = time.perf_counter()
+        for i in range(size):
+            self.parents.append(self.sweep(i))
+        self.build_time = time.perf_counter() - start_time
+
+    def sweep(self, i):
+        """
+        Runs Dijkstra from nodes[i] until every node after it in the table is settled.
+          -- The graph is undirected, so the earlier nodes already know their path to nodes[i]
+          -- On a CompactGraph the sweep works on node indices (see sweep_compact)
+        :param i: the index of the source node
+        :return: the parents of every node on a path from nodes[i] to one of its targets
+        """
+        source = self.nodes[i]
+        if source not in self.graph:
+            return {}
+        self.distances[i][i] = 0
+        if isinstance(self.graph, CompactGraph):
+            return self.sweep_compact(i)
+        targets = set(self.nodes[i + 1:])
+
+        queue = StateQueue(Problem(source, None, self.graph, zero_heuristic))
+        while targets and not queue.empty():
+            current_state = queue.get()
+            self.nodes_expanded += 1
+            if current_state in targets:
+                targets.remove(current_state)
+                j = self.index[current_state]
+                self.distances[i][j] = self.distances[j][i] = queue.cost[current_state]
+            AStar.expand(queue.problem, queue, current_state)
+
+        # keep only the part of the tree that leads to the targets
+        parents = {}
+        for node in self.nodes[i + 1:]:
+            while node in queue.closed and node != source and node not in parents:
+                parents[node] = queue.path[node]
+                node = queue.path[node]
+        return parents
+
+    def sweep_compact(self, i):
+        """
+        sweep on a CompactGraph: the costs and parents are lists indexed by node, like Landmarks.sweep,
+        and only the part of the tree that is kept is turned back into (x, y) nodes
+        :param i: the index of the source node
+        :return: the parents of every node on a path from nodes[i] to one of its targets
+        """
+        graph = self.graph
+        offsets, neighbours, weights, node_list = graph.offsets, graph.neighbours, graph.weights, graph.node_list
+        source = graph.index[self.nodes[i]]
+        targets = {}                # node index -> row/column of the node in the table
+        for j in range(i + 1, len(self.nodes)):
+            if self.nodes[j] in graph:
+                targets[graph.index[self.nodes[j]]] = j
+
+        cost = [float("inf")] * len(node_list)
+        cost[source] = 0
+        parent = [-1] * len(node_list)
+        closed = bytearray(len(node_list))
+        frontier = [(0, source)]
+        left = len(targets)
+        while left and frontier:
+            cost_so_far, u = heapq.heappop(frontier)
+            if closed[u]:
+                continue
+            closed[u] = 1
+            self.nodes_expanded += 1
+            if u in targets:
+                left -= 1
+                j = targets[u]
+                self.distances[i][j] = self.distances[j][i] = cost_so_far
+            for k in range(offsets[u], offsets[u + 1]):
+                v = neighbours[k]
+                if cost_so_far + weights[k] < cost[v]:
+                    cost[v] = cost_so_far + weights[k]
+                    parent[v] = u
+                    heapq.heappush(frontier, (cost[v], v))
+
+        # keep only the part of the tree that leads to the targets
+        parents = {}
+        for u in targets:
+            while closed[u] and u != source and node_list[u] not in parents:
+                parents[node_list[u]] = node_list[parent[u]]
+                u = parent[u]
+        return parents
+
+    def distance(self, source, destination):
+        """
+        The cost of the cheapest path between two interesting nodes
+        :param source: the start node
+        :param destination: the goal node
+        :return: the cost (inf if there is no path)
+        """
+        return self.distances[self.index[source]][self.index[destination]]
+
+    def path(self, source, destination):
+        """
+        Rebuilds the cheapest path between two interesting nodes from the parent trees
+        :param source: the start node
+        :param destination: the goal node
+        :return: the path from source to destination, or None if there isn't one
+        """
+        i = self.index[source]
+        j = self.index[destination]
+        if self.distances[i][j] == float("inf"):
+            return None
+
+        reverse = i > j                 # only the earlier node of the two stores the tree
+        if reverse:
+            i, j = j, i
+        parents = self.parents[i]
+        current_state = self.nodes[j]
+        path = [current_state]
+        while current_state != self.nodes[i]:
+            current_state = parents[current_state]
+            path.append(current_state)
+        if not reverse:
+            path.reverse()
+        return path
+
+    def search(self, problem):
+        """
+        Looks the problem up in the table, or searches for it with the fallback if it isn't there
+        :param problem: An initialized object of type Problem
+        :return: the same quintuple as AStar.search
+        """
+        if problem.initial_state not in self.index or problem.goal_state not in self.index:
+            return self.fallback.search(problem)
+
+        start_time = time.perf_counter()
+        stats = {'nodes_expanded': 0, 'stale_pops': 0}
+        path = self.path(problem.initial_state, problem.goal_state)
+        if path is None:
+            return False, None, None, time.perf_counter() - start_time, stats
+        cost = self.distance(problem.initial_state, problem.goal_state)
+        return True, path, cost, time.perf_counter() - start_time, stats
+
+    def search_nearest(self, problem):
+        """
+        Finds the closest goal of a MultiGoalProblem by looking every goal up in the table
+        :param problem: An initialized object of type MultiGoalProblem
+        :return: the same sextuple as AStar.search_nearest
+        """
+        goal_states = problem.goal_states
+        if problem.initial_state not in self.index or not all(goal in self.index for goal in goal_states):
+            return self.fallback.search_nearest(problem)
+
+        start_time = time.perf_counter()
+        stats = {'nodes_expanded': 0, 'stale_pops': 0}
+        row = self.distances[self.index[problem.initial_state]]
+        goal = min(goal_states, key=lambda state: (row[self.index[state]], self.index[state])) if goal_states else None
+        if goal is None or row[self.index[goal]] == float("inf"):
+            return False, None, None, None, time.perf_counter() - start_time, stats
+        path = self.path(problem.initial_state, goal)
+        return True, goal, path, row[self.index[goal]], time.perf_counter() - start_time, stats
+
+    def memory_usage(self):
+        """
+        Roughly how much memory the table takes (the nodes themselves are shared with the graph)
+        :return: the size of the table in bytes
+        """
+        size = sys.getsizeof(self.nodes) + sys.getsizeof(self.index) + sys.getsizeof(self.distances)
+        size += sum(sys.getsizeof(row) for row in self.distances)
+        size += sys.getsizeof(self.parents) + sum(sys.getsizeof(tree) for tree in self.parents)
+        return size
@@ -0,0 +1,118 @@
+import collections
+import json
+import sys
+from enum import Enum
+
+# Log levels: a record is kept if its level is at least the level of the log
+DEBUG = 10
+INFO = 20
+WARNING = 30
+OFF = 100
+LEVELS = {'debug': DEBUG, 'info': INFO, 'warning': WARNING, 'off': OFF}
+
+
+class TruckStatus(Enum):
+    """
+    What a truck did, with the level that it is logged at (moving along a route happens every tick,
+    so it is DEBUG; decisions are INFO; searches that fail are WARNING)
+    """
+    ASSIGNED_PACKAGE = ('Assigned package', INFO)
+    CLOSEST_PACKAGE = ('Closest package', INFO)
+    PICKING_UP = ('Picking up package', INFO)
+    DROPPING_OFF = ('Dropping off package', INFO)
+    RETURNING_TO_GARAGE = ('Returning to garage', INFO)
+    WAITING_AT_GARAGE = ('Waiting for other trucks to return', DEBUG)
+    TO_PACKAGE = ('Navigating to package', DEBUG)
+    TO_DESTINATION = ("Navigating to package's destination", DEBUG)
+    TO_GARAGE = ('Navigating to garage', DEBUG)
+    NO_PATH = ('Search could not find a path', WARNING)
+    NO_DECISION = ("Didn't cover all cases", WARNING)
+
+    def __init__(self, description, level):
+        self.description = description
+        self.level = level
+
+
+# One thing that a truck did (truck is None for the search of a package, before the run)
+Record = collections.namedtuple('Record', ['tick', 'truck', 'status', 'location', 'package'])
+
+
+class EventLog:
+    """
+    The EventLog class keeps what the trucks do as Records in a ring buffer, instead of printing it.
+      -- Records below the level of the log aren't made at all: callers check the debug, info and warning
+         flags first (a single attribute lookup), so a log that is off costs nothing per tick.
+      -- Records at or above echo_level are also printed as they come, so failed searches still show up.
+      -- Only the last capacity records are kept; export() writes them as JSON lines.
+    """
+
+    def __init__(self, level=OFF, echo_level=WARNING, capacity=100000, stream=None):
+        """
+        :param level: the lowest level that is kept (DEBUG, INFO, WARNING or OFF)
+        :param echo_level: the lowest level that is printed as well
+        :param capacity: the most records that are kept (the oldest ones go first)
+        :param stream: where records are printed (sys.stdout if None)
+        """
+        self.level = level
+        self.echo_level = echo_level
+        self.records = collections.deque(maxlen=capacity)
+        self.stream = stream
+
+        # A record of a level is only worth making if it is kept or printed
+        lowest = min(level, echo_level)
+        self.debug = DEBUG >= lowest
+        self.info = INFO >= lowest
+        self.warning = WARNING >= lowest
+
+        # Tracking
+        self.records_made = 0
+
+    def add(self, tick, truck, status, location, package=None):
+        """
+        Logs what a truck did. Callers check the flag of the status's level first.
+        :param tick: the iteration of the simulation
+        :param truck: the ID of the truck
+        :param status: a TruckStatus
+        :param location: where the truck is
+        :param package: the ID of the package that it is about, if there is one
+        :return: N/A
+        """
+        record = Record(tick, truck, status, location, package)
+        self.records_made += 1
+        if status.level >= self.level:
+            self.records.append(record)
+        if status.level >= self.echo_level:
+            (self.stream if self.stream is not None else sys.stdout).write(EventLog.format(record) + '\n')
+
+    @staticmethod
+    def format(record):
+        """
+        :param record: a Record
+        :return: the record as one line of text
+        """
+        text = 'Tick: ' + str(record.tick)
+        if record.truck is not None:
+            text += '  |  Truck: ' + str(record.truck)
+        text += '  |  Location: ' + str(record.location) + '  |  ' + record.status.description
+        if record.package is not None:
+            text += ' P' + str(record.package)
+        return text
+
+    @staticmethod
+    def to_dict(record):
+        """
+        :param record: a Record
+        :return: the record as a dictionary that can be written as JSON
+        """
+        return {'tick': record.tick, 'truck': record.truck, 'status': record.status.name,
+                'location': list(record.location), 'package': record.package}
+
+    def export(self, filename):
+        """
+        Writes the records that are kept to a JSON lines file, one record per line, oldest first
+        :param filename: the file to write
+        :return: N/A
+        """
+        with open(filename, 'w') as f:
+            for record in self.records:
+                f.write(json.dumps(EventLog.to_dict(record)) + '\n')
@@ -0,0 +1,263 @@
+import heapq
+import time
+import networkx as nx
+from AStar import Problem, AStar
+from CompactGraph import CompactGraph
+from Map import min_edge_weight
+
+
+class HPAStar:
+    """
+    The HPAStar class routes on a small abstract graph instead of the whole map (Hierarchical Path-finding A*).
+    The map is cut into square clusters. Where two clusters touch, every run of open border crossings (an
+    entrance) gets transitions: pairs of nodes, one on each side, that become nodes of the abstract graph.
+    Transitions of the same cluster are joined by the cost of the cheapest path between them inside the
+    cluster, and the two sides of a transition by their edge.
+    A query connects its start and goal to the transitions of their clusters, runs A* on the abstract graph
+    (which grows with the number of clusters, not with the size of the map), and then fills in the path
+    inside each cluster that it crosses. Those pieces are only searched for when they are first needed.
+    It answers search(problem) just like AStar, and hands search_nearest(problem) to a fallback search.
+
+    Optimality vs speed:
+      -- entrance_width: every entrance is cut into pieces of at most this many crossings, with a transition
+         in the middle of each. 1 puts a transition on every crossing and the paths are always the cheapest;
+         wider entrances make the abstract graph smaller and the queries faster, but paths can be a bit longer.
+      -- cluster_size: bigger clusters make a smaller abstract graph (faster queries, fewer detours
+         at the cluster borders) but take longer to build and to fill in.
+    """
+
+    def __init__(self, graph, cluster_size=16, entrance_width=6, fallback=AStar):
+        """
+        Builds the clusters, the transitions and the abstract graph
+        :param graph: the grid map (networkx or CompactGraph) with (x, y) nodes
+        :param cluster_size: the width and height of a cluster, in nodes
+        :param entrance_width: the most border crossings that share one transition
+        :param fallback: anything with a search_nearest(problem) method
+        """
+        assert cluster_size > 0 and entrance_width > 0
+        self.graph = graph
+        self.cluster_size = cluster_size
+        self.entrance_width = entrance_width
+        self.fallback = fallback
+        self.transitions = {}       # cluster -> the transition nodes inside of it
+        self.segments = {}          # (node, node) -> the path between two nodes of the same cluster
+        self.abstract = nx.Graph()
+        self.abstract.graph['min_weight'] = min_edge_weight(graph)
+        self.nodes_expanded = 0
+
+        start_time = time.perf_counter()
+        self.find_transitions()
+        for cluster, transitions in self.transitions.items():
+            self.connect(cluster, transitions)
+        self.build_time = time.perf_counter() - start_time
+
+    def cluster(self, node):
+        """
+        :param node: an (x, y) node
+        :return: the (column, row) of the cluster that the node is in
+        """
+        return node[0] // self.cluster_size, node[1] // self.cluster_size
+
+    def edge_weight(self, u, v):
+        """
+        :return: the weight of the edge between u and v, or None if there isn't one
+        """
+        for next_state, weight in Problem(u, None, self.graph).weighted_successors(u):
+            if next_state == v:
+                return weight
+        return None
+
+    def find_transitions(self):
+        """
+        Finds the entrances between every pair of neighbouring clusters, and adds their transitions
+        (and the edges across them) to the abstract graph
+        :return: N/A
+        """
+        crossings = {}              # (cluster, cluster) -> [(position along the border, u, v, weight)]
+        for u in self.graph.nodes():
+            for v in ((u[0] + 1, u[1]), (u[0], u[1] + 1)):
+                if self.cluster(u) == self.cluster(v) or v not in self.graph:
+                    continue
+                weight = self.edge_weight(u, v)
+                if weight is not None:
+                    position = u[1] if v[0] != u[0] else u[0]
+                    crossings.setdefault((self.cluster(u), self.cluster(v)), []).append((position, u, v, weight))
+
+        for border in crossings.values():
+            border.sort()
+            entrance = []
+            for crossing in border:
+                if entrance and (crossing[0] != entrance[-1][0] + 1 or len(entrance) == self.entrance_width):
+                    self.add_transition(entrance)
+                    entrance = []
+                entrance.append(crossing)
+            self.add_transition(entrance)
+
+    def add_transition(self, entrance):
+        """
+        Makes the crossing in the middle of an entrance a transition
+        :param entrance: consecutive (position, u, v, weight) crossings of one border
+        :return: N/A
+        """
+        position, u, v, weight = entrance[len(entrance) // 2]
+        for node in (u, v):
+            self.transitions.setdefault(self.cluster(node), set()).add(node)
+        self.abstract.add_edge(u, v, weight=weight)
+
+    def sweep(self, source, targets):
+        """
+        Runs Dijkstra from source without leaving the cluster of source, until every target is settled
+        :param source: the start node
+        :param targets: nodes in the same cluster as source
+        :return: the cost and the parent of every settled node
+        """
+        if isinstance(self.graph, CompactGraph):
+            return self.sweep_compact(source, targets)
+
+        cluster = self.cluster(source)
+        problem = Problem(source, None, self.graph)
+        targets = set(targets)
+        frontier = [(0, source)]
+        cost = {source: 0}
+        parent = {source: None}
+        closed = set()
+        while frontier and targets:
+            cost_so_far, state = heapq.heappop(frontier)
+            if state in closed:
+                continue
+            closed.add(state)
+            targets.discard(state)
+            self.nodes_expanded += 1
+            for next_state, weight in problem.weighted_successors(state):
+                if next_state in closed or self.cluster(next_state) != cluster:
+                    continue
+                if next_state not in cost or cost_so_far + weight < cost[next_state]:
+                    cost[next_state] = cost_so_far + weight
+                    parent[next_state] = state
+                    heapq.heappush(frontier, (cost[next_state], next_state))
+        return {state: cost[state] for state in closed}, parent
+
+    def sweep_compact(self, source, targets):
+        """
+        The same sweep as sweep(), on the node indices and CSR arrays of a CompactGraph (see AStar.search_compact)
+        :return: the cost and the parent of every settled node
+        """
+        graph = self.graph
+        node_list, offsets, neighbours, weights = graph.node_list, graph.offsets, graph.neighbours, graph.weights
+        xs, ys, size = graph.xs, graph.ys, self.cluster_size
+        cluster_x, cluster_y = self.cluster(source)
+        start = graph.index[source]
+        targets = set(graph.index[target] for target in targets)
+        frontier = [(0, start)]
+        cost = {start: 0}
+        parent = {start: -1}
+        closed = set()
+        while frontier and targets:
+            cost_so_far, i = heapq.heappop(frontier)
+            if i in closed:
+                continue
+            closed.add(i)
+            targets.discard(i)
+            self.nodes_expanded += 1
+            for k in range(offsets[i], offsets[i + 1]):
+                j = neighbours[k]
+                if j in closed or xs[j] // size != cluster_x or ys[j] // size != cluster_y:
+                    continue
+                next_cost = cost_so_far + weights[k]
+                if j not in cost or next_cost < cost[j]:
+                    cost[j] = next_cost
+                    parent[j] = i
+                    heapq.heappush(frontier, (next_cost, j))
+        return ({node_list[i]: cost[i] for i in closed},
+                {node_list[i]: node_list[parent[i]] if parent[i] != -1 else None for i in closed})
+
+    def connect(self, cluster, transitions, node=None):
+        """
+        Joins transitions of a cluster in the abstract graph by the cost of their cheapest path inside of it
+        :param cluster: the cluster
+        :param transitions: the transitions to join
+        :param node: join only this node to the transitions (for the start and goal of a query)
+        :return: the edges that were added
+        """
+        added = []
+        sources = [node] if node is not None else sorted(transitions)
+        for i, source in enumerate(sources):
+            targets = [t for t in transitions if t != source] if node is not None else sources[i + 1:]
+            cost = self.sweep(source, targets)[0]
+            for target in targets:
+                if target in cost and not self.abstract.has_edge(source, target):
+                    self.abstract.add_edge(source, target, weight=cost[target])
+                    added.append((source, target))
+        return added
+
+    def refine(self, u, v):
+        """
+        The whole path between two neighbouring nodes of an abstract path
+        :param u: a node of the abstract path
+        :param v: the next node
+        :return: the path from u to v on the map
+        """
+        if self.cluster(u) != self.cluster(v):
+            return [u, v]
+        if (u, v) in self.segments:
+            return self.segments[(u, v)]
+        if (v, u) in self.segments:
+            return self.segments[(v, u)][::-1]
+
+        parent = self.sweep(u, [v])[1]
+        path = [v]
+        while path[-1] != u:
+            path.append(parent[path[-1]])
+        path.reverse()
+        self.segments[(u, v)] = path
+        return path
+
+    def search(self, problem):
+        """
+        Connects the start and the goal to the abstract graph, searches it with A*, and fills in the path
+        :param problem: An initialized object of type Problem
+        :return: the same quintuple as AStar.search -- nodes_expanded counts the abstract nodes
+                 and the map nodes of the searches inside of the clusters
+        """
+        start_time = time.perf_counter()
+        stats = {'nodes_expanded': 0, 'stale_pops': 0}
+        start, goal = problem.initial_state, problem.goal_state
+        if start not in self.graph or goal not in self.graph:
+            return False, None, None, time.perf_counter() - start_time, stats
+        if start == goal:
+            return True, [start], 0, time.perf_counter() - start_time, stats
+
+        expanded_before = self.nodes_expanded
+        new_nodes = [node for node in (start, goal) if node not in self.abstract]
+        self.abstract.add_nodes_from(new_nodes)
+        added = []
+        for node in (start, goal):
+            cluster = self.cluster(node)
+            transitions = set(self.transitions.get(cluster, ()))
+            if node == start and self.cluster(goal) == cluster:
+                transitions.add(goal)
+            added += self.connect(cluster, transitions, node)
+
+        search = AStar.search(Problem(start, goal, self.abstract, problem.heuristic))
+        self.abstract.remove_edges_from(added)
+        self.abstract.remove_nodes_from(new_nodes)
+        stats['nodes_expanded'] = search[4]['nodes_expanded']
+        stats['stale_pops'] = search[4]['stale_pops']
+        if not search[0]:
+            stats['nodes_expanded'] += self.nodes_expanded - expanded_before
+            return False, None, None, time.perf_counter() - start_time, stats
+
+        abstract_path = search[1]
+        path = [start]
+        for u, v in zip(abstract_path, abstract_path[1:]):
+            path += self.refine(u, v)[1:]
+        stats['nodes_expanded'] += self.nodes_expanded - expanded_before
+        return True, path, search[2], time.perf_counter() - start_time, stats
+
+    def search_nearest(self, problem):
+        """
+        Multi-goal searches go to the fallback
+        :param problem: An initialized object of type MultiGoalProblem
+        :return: the same sextuple as AStar.search_nearest
+        """
+        return self.fallback.search_nearest(problem)
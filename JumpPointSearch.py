@@ -0,0 +1,200 @@
+import heapq
+import time
+from AStar import AStar, frontier_stats
+from CompactGraph import CompactGraph
+
+
+def uniform_weight(graph):
+    """
+    The weight of every edge of the graph, if they all have the same one.
+    It is worked out once and kept in graph.graph, like Map.min_edge_weight.
+
+    :param graph: a networkx graph or a CompactGraph
+    :return: the weight, or None if the edges don't all weigh the same
+    """
+    if 'uniform_weight' not in graph.graph:
+        if isinstance(graph, CompactGraph):
+            weights = set(graph.weights)
+        else:
+            weights = set(d['weight'] for (i, j, d) in graph.edges(data=True))
+        graph.graph['uniform_weight'] = weights.pop() if len(weights) == 1 else None
+    return graph.graph['uniform_weight']
+
+
+def between(start, value, end):
+    """
+    :return: True if value is after start, and not after end, going from start towards end
+    """
+    return start < value <= end or end <= value < start
+
+
+class JumpPointSearch(AStar):
+    """
+    Jump Point Search for the maps that Map.makeMap makes with the default weights: 4-connected grids
+    where every edge costs the same and the holes are the missing nodes.
+    Instead of adding every neighbour to the frontier, the search jumps in a straight line until it gets
+    somewhere a turn could be needed, and only those jump points go on the frontier.
+      -- Moving across (along x), a jump stops at a node where the node beside it is open but the node
+         beside the one before it isn't (a forced neighbour: the cheapest way there turns here).
+      -- Moving along y, a jump stops at any node where a jump across, either way, would stop somewhere.
+      -- Any other map (edges that don't all weigh the same) is searched with AStar.search instead.
+    It answers search(problem) just like AStar, and can be used anywhere that AStar can.
+    """
+
+    @staticmethod
+    def search(problem):
+        """
+        Performs Jump Point Search, or A* when the edges of the graph don't all weigh the same
+
+        :param problem: An initialized object of type Problem
+        :return: the same quintuple as AStar.search -- nodes_expanded counts the jump points expanded,
+                 and the path has every node on it, not just the jump points
+        """
+        weight = uniform_weight(problem.graph)
+        if weight is None:
+            return AStar.search(problem)
+
+        start_time = time.perf_counter()
+        stats = {'nodes_expanded': 0, 'stale_pops': 0}
+        start, goal, graph = problem.initial_state, problem.goal_state, problem.graph
+        if start not in graph or goal not in graph:
+            return False, None, None, time.perf_counter() - start_time, stats
+
+        # ties between jump points with the same priority go to the one furthest along (the largest cost),
+        # otherwise the whole rectangle between the start and the goal of an open map has the same priority
+        frontier = [(problem.estimate(start), 0, start)]
+        cost = {start: 0}
+        parent = {start: None}
+        closed = set()
+        max_frontier = 1
+        while frontier:
+            if len(frontier) > max_frontier:
+                max_frontier = len(frontier)
+            state = heapq.heappop(frontier)[2]
+            if state in closed:
+                stats['stale_pops'] += 1
+                continue
+            closed.add(state)
+            stats['nodes_expanded'] += 1
+
+            # GOAL:
+            if state == goal:
+                frontier_stats(stats, len(frontier), max_frontier)
+                return True, JumpPointSearch.make_path(parent, goal), cost[goal], time.perf_counter() - start_time, stats
+
+            for dx, dy in JumpPointSearch.directions(state, parent[state]):
+                jump_point = JumpPointSearch.jump(graph, state, dx, dy, goal)
+                if jump_point is None or jump_point in closed:
+                    continue
+                next_cost = cost[state] + weight * (abs(jump_point[0] - state[0]) + abs(jump_point[1] - state[1]))
+                if jump_point not in cost or next_cost < cost[jump_point]:
+                    cost[jump_point] = next_cost
+                    parent[jump_point] = state
+                    heapq.heappush(frontier, (next_cost + problem.estimate(jump_point), -next_cost, jump_point))
+
+        frontier_stats(stats, 0, max_frontier)
+        return False, None, None, time.perf_counter() - start_time, stats
+
+    @staticmethod
+    def directions(state, parent):
+        """
+        The directions worth jumping in from a jump point
+        :param state: the jump point
+        :param parent: the jump point it was reached from (None for the start)
+        :return: a list of (dx, dy) steps
+        """
+        if parent is None:
+            return [(1, 0), (-1, 0), (0, 1), (0, -1)]
+        if parent[1] == state[1]:
+            dx = 1 if state[0] > parent[0] else -1
+            return [(dx, 0), (0, 1), (0, -1)]
+        dy = 1 if state[1] > parent[1] else -1
+        return [(0, dy), (1, 0), (-1, 0)]
+
+    @staticmethod
+    def jump(graph, state, dx, dy, goal):
+        """
+        Moves from state in a straight line until it gets to a jump point
+        :param graph: the graph -- a node that isn't in it is a hole
+        :param state: where the jump starts
+        :param dx: the step along x (-1, 0 or 1)
+        :param dy: the step along y (-1, 0 or 1)
+        :param goal: the goal node, which is always a jump point
+        :return: the jump point, or None if the jump runs into a hole first
+        """
+        end, forced = JumpPointSearch.scan(graph, state, dx, dy)
+        x, y = state
+        if dy == 0:
+            if goal[1] == y and between(x, goal[0], end[0]):
+                return goal
+        else:
+            if goal[0] == x and between(y, goal[1], end[1]):
+                return goal
+            # a jump across from the goal's row would find the goal
+            if between(y, goal[1], end[1]) and goal[0] != x:
+                step = 1 if goal[0] > x else -1
+                across, across_forced = JumpPointSearch.scan(graph, (x, goal[1]), step, 0)
+                if between(x, goal[0], across[0]):
+                    return x, goal[1]
+        return end if forced else None
+
+    @staticmethod
+    def scan(graph, state, dx, dy):
+        """
+        The part of a jump that doesn't depend on the goal, which is the same for every search on the graph.
+        Scans are kept in graph.graph (the graphs that are searched are never changed), and every node that
+        a scan passes over gets the same answer, so most jumps are a lookup.
+
+        :param graph: the graph -- a node that isn't in it is a hole
+        :param state: where the jump starts
+        :param dx: the step along x (-1, 0 or 1)
+        :param dy: the step along y (-1, 0 or 1)
+        :return: (end, forced) -- forced is True if end is a jump point, otherwise end is the last node
+                 before a hole (which may be state itself)
+        """
+        scans = graph.graph.setdefault('jump_scans', {})
+        key = (state, dx, dy)
+        if key in scans:
+            return scans[key]
+
+        passed = [state]
+        x, y = state
+        while True:
+            if (x + dx, y + dy) not in graph:
+                result = (x, y), False
+                break
+            x += dx
+            y += dy
+            if dy == 0:
+                if ((x, y + 1) in graph and (x - dx, y + 1) not in graph) or \
+                        ((x, y - 1) in graph and (x - dx, y - 1) not in graph):
+                    result = (x, y), True
+                    break
+            elif JumpPointSearch.scan(graph, (x, y), 1, 0)[1] or JumpPointSearch.scan(graph, (x, y), -1, 0)[1]:
+                result = (x, y), True
+                break
+            passed.append((x, y))
+
+        for node in passed:
+            scans[(node, dx, dy)] = result
+        return result
+
+    @staticmethod
+    def make_path(parent, goal_state):
+        """
+        Rebuilds the whole path from the jump points, filling in the straight lines between them
+        :param parent: the jump point that every jump point was reached from
+        :param goal_state: the goal that was reached
+        :return: every node from the initial state to goal_state
+        """
+        path = [goal_state]
+        state = goal_state
+        while parent[state] is not None:
+            previous = parent[state]
+            dx = (previous[0] > state[0]) - (previous[0] < state[0])
+            dy = (previous[1] > state[1]) - (previous[1] < state[1])
+            while state != previous:
+                state = (state[0] + dx, state[1] + dy)
+                path.append(state)
+        path.reverse()
+        return path
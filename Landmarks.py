@@ -0,0 +1,226 @@
+import hashlib
+import heapq
+import os
+import time
+from array import array
+import numpy
+from AStar import AStar, Problem, manhattan_heuristic
+from CompactGraph import CompactGraph
+
+
+def fingerprint(graph):
+    """
+    A hash of every node and every weighted edge of the graph, which doesn't depend on the order that they
+    are stored in. Two maps with the same nodes but different weights get different fingerprints, so tables
+    saved for one of them are never used for the other.
+
+    :param graph: the graph (networkx or CompactGraph)
+    :return: the fingerprint, as a hex string
+    """
+    compact = graph if isinstance(graph, CompactGraph) else CompactGraph.from_networkx(graph)
+    xs = numpy.array(compact.xs, dtype=float)
+    ys = numpy.array(compact.ys, dtype=float)
+    offsets = numpy.array(compact.offsets, dtype=int)
+    sources = numpy.repeat(numpy.arange(len(xs)), numpy.diff(offsets))
+    targets = numpy.array(compact.neighbours, dtype=int)
+    edges = numpy.column_stack((xs[sources], ys[sources], xs[targets], ys[targets],
+                                numpy.array(compact.weights, dtype=float)))
+    nodes = numpy.column_stack((xs, ys))
+    digest = hashlib.sha1()
+    digest.update(nodes[numpy.lexsort(nodes.T[::-1])].tobytes())
+    digest.update(edges[numpy.lexsort(edges.T[::-1])].tobytes())
+    return digest.hexdigest()
+
+
+class Landmarks:
+    """
+    The Landmarks class is the ALT (A*, Landmarks, Triangle inequality) heuristic.
+    A few landmarks are picked far apart on the map, and the cost from each of them to every node is kept.
+    For any landmark L, |d(L, goal) - d(L, state)| is never more than the cost from state to goal, so the
+    largest of those (or the manhattan estimate, if it is larger) is an admissible and consistent heuristic
+    that knows about the weights and the holes of the map, where the manhattan estimate only knows the
+    cheapest edge.
+    It answers search(problem) like AStar, by running AStar with that heuristic, and the tables can be
+    saved next to the scenario so that the next run on the same map doesn't have to make them again.
+    """
+
+    def __init__(self, graph, count=8, nodes=None, landmarks=None, distances=None, map_fingerprint=None):
+        """
+        Picks the landmarks and makes their tables, unless the tables are given (see load)
+        :param graph: the graph (networkx or CompactGraph)
+        :param count: the number of landmarks
+        :param nodes: the nodes that the columns of the distances are for
+        :param landmarks: the landmark nodes
+        :param distances: count x nodes array, the cost from every landmark to every node
+        :param map_fingerprint: the fingerprint of the graph, if it is already known (see fingerprint)
+        """
+        self.graph = graph
+        self.build_time = 0
+        self.nodes_expanded = 0
+        if distances is not None:
+            self.nodes = nodes
+            self.index = {node: i for i, node in enumerate(nodes)}
+            self.landmarks = landmarks
+            self.distances = distances
+        else:
+            start_time = time.perf_counter()
+            compact = graph if isinstance(graph, CompactGraph) else CompactGraph.from_networkx(graph)
+            self.nodes = compact.node_list
+            self.index = compact.index
+            self.landmarks, self.distances = self.pick(compact, count)
+            if map_fingerprint is None:
+                map_fingerprint = fingerprint(compact)
+            self.build_time = time.perf_counter() - start_time
+
+        self.map_fingerprint = map_fingerprint
+
+        # the heuristic reads one column per call, so the columns are kept one after the other
+        self.count = len(self.landmarks)
+        self.table = array('d', numpy.ascontiguousarray(self.distances.T, dtype=float).tobytes())
+
+    def sweep(self, graph, source):
+        """
+        Runs Dijkstra from source over the whole graph
+        :param graph: a CompactGraph
+        :param source: the index of the start node
+        :return: numpy array, the cost from source to every node (inf where there is no path)
+        """
+        offsets, neighbours, weights = graph.offsets, graph.neighbours, graph.weights
+        cost = [float("inf")] * len(graph.node_list)
+        cost[source] = 0
+        frontier = [(0, source)]
+        closed = set()
+        while frontier:
+            cost_so_far, i = heapq.heappop(frontier)
+            if i in closed:
+                continue
+            closed.add(i)
+            self.nodes_expanded += 1
+            for k in range(offsets[i], offsets[i + 1]):
+                j = neighbours[k]
+                if cost_so_far + weights[k] < cost[j]:
+                    cost[j] = cost_so_far + weights[k]
+                    heapq.heappush(frontier, (cost[j], j))
+        return numpy.array(cost)
+
+    def pick(self, graph, count):
+        """
+        Picks landmarks far apart: each one is the node that is the furthest from the ones picked so far
+        (the first one is the furthest from an arbitrary node)
+        :param graph: a CompactGraph
+        :param count: the number of landmarks
+        :return: the landmark nodes, and count x nodes array of the costs from them
+        """
+        if not graph.node_list:
+            return [], numpy.zeros((0, 0))
+        distance = self.sweep(graph, 0)
+        closest = numpy.full(len(graph.node_list), numpy.inf)
+        landmarks = []
+        rows = []
+        for _ in range(min(count, len(graph.node_list))):
+            furthest = closest if landmarks else distance
+            i = int(numpy.where(numpy.isfinite(furthest), furthest, -1).argmax())
+            landmarks.append(graph.node_list[i])
+            rows.append(self.sweep(graph, i))
+            closest = numpy.minimum(closest, rows[-1])
+        return landmarks, numpy.array(rows)
+
+    def heuristic(self, state, goal_state, graph):
+        """
+        The ALT estimate, as a heuristic function for Problem
+        :param state: the current node
+        :param goal_state: the goal node
+        :param graph: the graph
+        :return: a lower bound on the cost from state to goal_state
+        """
+        table, count = self.table, self.count
+        i = self.index[state] * count
+        j = self.index[goal_state] * count
+        best = manhattan_heuristic(state, goal_state, graph)
+        for k in range(count):
+            d = table[i + k] - table[j + k]
+            if d > best:
+                best = d
+            elif -d > best:
+                best = -d
+        return best
+
+    def search(self, problem):
+        """
+        Performs A* with the landmark heuristic
+        :param problem: An initialized object of type Problem (its heuristic is replaced)
+        :return: the same quintuple as AStar.search
+        """
+        return AStar.search(Problem(problem.initial_state, problem.goal_state, problem.graph, self.heuristic))
+
+    def search_nearest(self, problem):
+        """
+        Multi-goal searches are Dijkstra sweeps anyway, so they go straight to AStar
+        :param problem: An initialized object of type MultiGoalProblem
+        :return: the same sextuple as AStar.search_nearest
+        """
+        return AStar.search_nearest(problem)
+
+    def memory_usage(self):
+        """
+        :return: the size of the tables in bytes
+        """
+        return self.distances.nbytes + self.table.itemsize * len(self.table)
+
+    def save(self, filename):
+        """
+        Writes the landmarks and their tables to a .npz file, with the fingerprint of the map they were made for
+        :param filename: where to write them (ending in .npz)
+        :return: N/A
+        """
+        if self.map_fingerprint is None:
+            self.map_fingerprint = fingerprint(self.graph)
+        numpy.savez(filename, nodes=numpy.array(self.nodes, dtype=int).reshape(-1, 2),
+                    landmarks=numpy.array(self.landmarks, dtype=int).reshape(-1, 2), distances=self.distances,
+                    fingerprint=numpy.array(self.map_fingerprint))
+
+    @staticmethod
+    def load(filename, graph):
+        """
+        Reads tables written by save()
+        :param filename: the .npz file
+        :param graph: the graph that the tables were made for
+        :return: the Landmarks, or None if the tables are for a different map (different nodes or weights,
+                 or a file without a fingerprint)
+        """
+        with numpy.load(filename) as data:
+            if 'fingerprint' not in data:
+                return None
+            saved_fingerprint = str(data['fingerprint'])
+            nodes = [tuple(node) for node in data['nodes'].tolist()]
+            landmarks = [tuple(node) for node in data['landmarks'].tolist()]
+            distances = data['distances']
+        if len(nodes) != len(graph) or not all(node in graph for node in nodes):
+            return None
+        map_fingerprint = fingerprint(graph)
+        if map_fingerprint != saved_fingerprint:
+            return None
+        return Landmarks(graph, len(landmarks), nodes, landmarks, distances, map_fingerprint)
+
+    @staticmethod
+    def prepare(graph, count=8, filename=None):
+        """
+        Loads the tables of the map from filename if they are there and were made for this map,
+        otherwise makes them (and saves them to filename, if it is set)
+        :param graph: the graph
+        :param count: the number of landmarks to make
+        :param filename: the .npz file that the tables are kept in (.npz is added if it is missing, as numpy.savez does)
+        :return: the Landmarks
+        """
+        if filename is not None and not filename.endswith('.npz'):
+            filename += '.npz'
+        if filename is not None and os.path.exists(filename):
+            start_time = time.perf_counter()
+            landmarks = Landmarks.load(filename, graph)
+            if landmarks is not None:
+                landmarks.build_time = time.perf_counter() - start_time
+                return landmarks
+        landmarks = Landmarks(graph, count)
+        if filename is not None:
+            landmarks.save(filename)
+        return landmarks
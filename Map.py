@@ -1,3 +1,4 @@
+import os
 import networkx as nx
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
@@ -6,13 +7,15 @@ import numpy
 import random as rand
 
 
-def makeMap(m, n, gapfreq):
+def makeMap(m, n, gapfreq, weights=None, seed=None):
     """ Creates a graph in the form of a grid, with mXn nodes.
     The graph has irregular holes poked into it by random deletion.
 
     :param m: number of nodes on one dimension of the grid
     :param n: number of nodes on the other dimension
     :param gapfreq: the fraction of nodes to delete (see function prune() below)
+    :param weights: the edge weight distribution (see below), default [(1,100)]
+    :param seed: seed for the random numbers; the same seed always gives the same map
     :return: a networkx graph with nodes and edges.
 
     The default edge weight is  (see below).  The edge weights can be changed by
@@ -22,14 +25,113 @@ def makeMap(m, n, gapfreq):
       33% each of 1,2,5: [(1,33),(2,67),(5,100)]
       a fancy distribution:  [(1,10),(4,50),(6,90),(10,100)]
       (10% @ 1, 40% @ 4, 40% @ 6, 10% @ 10)
+
+    The grid is generated with numpy by makeGrid() (same distribution as prune() and setWeights()),
+    so only building the networkx graph itself takes real time.
+    """
+    if weights is None:
+        weights = [(1, 100)]
+    return graphFromGrid(*makeGrid(m, n, gapfreq, weights, seed))
+
+
+def makeGrid(m, n, gapfreq, weights, seed=None):
+    """ Generates the same kind of map as prune() and setWeights(), but as numpy arrays.
+    Every step works on the whole grid at once, so maps of 2000x2000 and up take seconds.
+
+    :param m: number of nodes on one dimension of the grid
+    :param n: number of nodes on the other dimension
+    :param gapfreq: the fraction of nodes to delete
+    :param weights: a list of pairs [(w,cf) ... ] (see setWeights())
+    :param seed: seed for the random numbers
+    :return: a triple:
+        nodes:    m x n bool array, True where node (i, j) is in the map
+        across:   (m-1) x n array, weight of the edge (i, j)-(i+1, j)  (0 where there is no edge)
+        down:     m x (n-1) array, weight of the edge (i, j)-(i, j+1)  (0 where there is no edge)
     """
-    g = nx.grid_2d_graph(m, n)
-    weights = [(1, 100)]
-    prune(g, gapfreq)
-    setWeights(g, weights)
+    random_state = numpy.random.RandomState(seed)
+
+    # creating gaps...
+    nodes = random_state.random_sample((m, n)) >= gapfreq
+    # deleting all but the largest connected component...
+    nodes = largestComponent(nodes)
+
+    # same lookup as setWeights: the first weight whose cumulative frequency is >= c
+    ws = numpy.array([a for (a, b) in weights])
+    cfs = numpy.array([b for (a, b) in weights])
+    across = ws[numpy.searchsorted(cfs, random_state.randint(1, 101, size=(max(m - 1, 0), n)))]
+    down = ws[numpy.searchsorted(cfs, random_state.randint(1, 101, size=(m, max(n - 1, 0))))]
+    across[~(nodes[:-1, :] & nodes[1:, :])] = 0
+    down[~(nodes[:, :-1] & nodes[:, 1:])] = 0
+    return nodes, across, down
+
+
+def largestComponent(nodes):
+    """ Finds the largest 4-connected component of a grid of nodes.
+
+    Labels the components by repeatedly hooking the larger root of every edge onto the smaller one
+    and then pointer jumping until every node points straight at its root (vectorized union-find).
+    Only a handful of rounds are needed even on very large grids.
+
+    :param nodes: m x n bool array, True where there is a node
+    :return: m x n bool array, True only for the nodes of the largest component
+    """
+    m, n = nodes.shape
+    index = numpy.arange(m * n).reshape(m, n)
+    parent = index.ravel().copy()
+
+    # the two ends of every edge of the grid
+    across = nodes[:-1, :] & nodes[1:, :]
+    down = nodes[:, :-1] & nodes[:, 1:]
+    a = numpy.concatenate((index[:-1, :][across], index[:, :-1][down]))
+    b = numpy.concatenate((index[1:, :][across], index[:, 1:][down]))
+
+    while True:
+        roots_a = parent[a]
+        roots_b = parent[b]
+        unjoined = roots_a != roots_b
+        if not unjoined.any():
+            break
+        numpy.minimum.at(parent, numpy.maximum(roots_a, roots_b)[unjoined], numpy.minimum(roots_a, roots_b)[unjoined])
+        while True:
+            grandparent = parent[parent]
+            if (grandparent == parent).all():
+                break
+            parent = grandparent
+
+    labels = parent.reshape(m, n)
+    if not nodes.any():
+        return nodes
+    largest = numpy.bincount(labels[nodes]).argmax()
+    return nodes & (labels == largest)
+
+
+def graphFromGrid(nodes, across, down):
+    """ Builds the networkx graph of a map made by makeGrid()
+    :param nodes: m x n bool array, True where node (i, j) is in the map
+    :param across: (m-1) x n array of the weights of the edges (i, j)-(i+1, j)
+    :param down: m x (n-1) array of the weights of the edges (i, j)-(i, j+1)
+    :return: a networkx graph with nodes and weighted edges
+    """
+    g = nx.Graph()
+    g.add_nodes_from(tuple(node) for node in numpy.argwhere(nodes).tolist())
+    g.add_edges_from(gridEdges(across, down))
+    weights = numpy.concatenate((across[across > 0], down[down > 0]))
+    g.graph['min_weight'] = weights.min().item() if weights.size else 1
     return g
 
 
+def gridEdges(across, down):
+    """ The edges of a map made by makeGrid()
+    :param across: (m-1) x n array of the weights of the edges (i, j)-(i+1, j)
+    :param down: m x (n-1) array of the weights of the edges (i, j)-(i, j+1)
+    :return: a generator of (node, node, {'weight': w}) triples
+    """
+    for (i, j), w in zip(numpy.argwhere(across > 0).tolist(), across[across > 0].tolist()):
+        yield (i, j), (i + 1, j), {'weight': w}
+    for (i, j), w in zip(numpy.argwhere(down > 0).tolist(), down[down > 0].tolist()):
+        yield (i, j), (i, j + 1), {'weight': w}
+
+
 def setWeights(g, weights):
     """ Use the weights list to set weights of graph g
     :param g: a networkx graph
@@ -40,14 +142,29 @@ def setWeights(g, weights):
     w is the weight, cf is the cumulative frequency
 
     This function uses a uniform random number to index into the weights list.
+    The smallest weight in the list is recorded as g.graph['min_weight'] so that
+    heuristics can stay admissible (see min_edge_weight() below).
     """
     for (i, j) in nx.edges(g):
         c = rand.randint(1, 100)
         w = [a for (a, b) in weights if b >= c]  # drop all pairs whose cf is < c
         g.edge[i][j]['weight'] = w[0]  # take the first weight in w
+    g.graph['min_weight'] = min(a for (a, b) in weights)
     return
 
 
+def min_edge_weight(g):
+    """ The smallest edge weight in graph g, used to scale distance heuristics.
+    Graphs made by setWeights() already know it; otherwise it is computed once and cached.
+
+    :param g: a networkx graph
+    :return: the minimum edge weight (1 if the graph has no edges)
+    """
+    if 'min_weight' not in g.graph:
+        g.graph['min_weight'] = min([d['weight'] for (i, j, d) in g.edges(data=True)] or [1])
+    return g.graph['min_weight']
+
+
 def draw(g):
     """ Draw the graph, just for visualization.  Also creates a jpg in $CWD
     :param g: a networkx graph
@@ -167,7 +284,7 @@ def draw_paths(graph, garages, trucks, p, p_being_picked_up, p_being_delivered,
         truck_locations.append(truck.location)
         truck_labels[truck.location] = 'T' + str(truck.ID)
         prev = truck.location
-        for item in truck.path:
+        for item in truck.remaining_path():
             truck_paths.append((prev, item))
             prev = item
 
@@ -203,7 +320,7 @@ def draw_paths(graph, garages, trucks, p, p_being_picked_up, p_being_delivered,
     fig = plt.gcf()
     fig.set_size_inches(30, 30)
     plt.axis()
-    filename="Simulation\sim" + str(i) + ".png"
+    filename = os.path.join("Simulation", "sim" + str(i) + ".png")
     plt.savefig(filename, dpi=50)
     # plt.show()
     plt.clf()       # CLEARS THE OLD GRAPH THAT WAS DRAWN
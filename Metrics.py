@@ -0,0 +1,101 @@
+import numpy
+
+# Where the searches of a simulation come from
+SITES = ('package_setup', 'nearest_package', 'return_to_garage', 'dispatch')
+
+# What is measured for every search: latency (seconds) is always there, the rest when the search reports it
+COUNTERS = ('latency', 'nodes_expanded', 'pushes', 'pops', 'max_frontier', 'path_length')
+
+PERCENTILES = (50, 90, 99)
+
+
+class SearchMetrics:
+    """
+    The SearchMetrics class keeps a sample of every counter for every search, by the site that the search
+    was made from, so the run can be summed up per site as percentiles (p50, p90, p99, max) and histograms.
+      -- The counters come from the stats dictionary that every search returns (see AStar.search);
+         searches that don't report a counter (a DistanceTable lookup has no frontier) just have no sample.
+      -- Failed searches are counted, and their latency and counters are kept, but they have no path length.
+    """
+
+    def __init__(self):
+        self.samples = {}           # site -> counter -> list of values
+        self.failures = {}          # site -> number of searches that didn't find a path
+
+    def record(self, site, runtime, stats, found, path=None):
+        """
+        Adds one search
+        :param site: where the search was made from (see SITES)
+        :param runtime: how long the search took, in seconds
+        :param stats: the stats dictionary that the search returned
+        :param found: False if the search didn't find a path
+        :param path: the path that it found, if it found a single one
+        :return: N/A
+        """
+        samples = self.samples.get(site)
+        if samples is None:
+            samples = self.samples[site] = {counter: [] for counter in COUNTERS}
+            self.failures[site] = 0
+        samples['latency'].append(runtime)
+        for counter in ('nodes_expanded', 'pushes', 'pops', 'max_frontier'):
+            if counter in stats:
+                samples[counter].append(stats[counter])
+        if path is not None:
+            samples['path_length'].append(len(path))
+        if not found:
+            self.failures[site] += 1
+
+    def count(self, site):
+        """
+        :return: the number of searches made from the site
+        """
+        return len(self.samples[site]['latency']) if site in self.samples else 0
+
+    def total(self, site, counter):
+        """
+        :return: the sum of a counter over the searches of a site
+        """
+        return sum(self.samples[site][counter]) if site in self.samples else 0
+
+    def percentiles(self, site, counter):
+        """
+        :param site: the site
+        :param counter: the counter (see COUNTERS)
+        :return: a dictionary of p50, p90, p99 and max, or None if there are no samples
+        """
+        values = self.samples.get(site, {}).get(counter)
+        if not values:
+            return None
+        values = numpy.array(values, dtype=float)
+        summary = {'p' + str(p): value for p, value in zip(PERCENTILES, numpy.percentile(values, PERCENTILES))}
+        summary['max'] = values.max()
+        return summary
+
+    def histogram(self, site, counter, bins=10):
+        """
+        :param site: the site
+        :param counter: the counter (see COUNTERS)
+        :param bins: the number of bins
+        :return: the counts and the bin edges (as numpy.histogram), or None if there are no samples
+        """
+        values = self.samples.get(site, {}).get(counter)
+        if not values:
+            return None
+        return numpy.histogram(values, bins=bins)
+
+    def to_dict(self):
+        """
+        :return: every site with its count, failures, the total and percentiles of every counter and a histogram
+                 of the latency, as a dictionary that can be written as JSON
+        """
+        result = {}
+        for site in self.samples:
+            result[site] = {'count': self.count(site), 'failures': self.failures[site]}
+            for counter in COUNTERS:
+                summary = self.percentiles(site, counter)
+                if summary is not None:
+                    summary['total'] = self.total(site, counter)
+                    result[site][counter] = {key: float(value) for key, value in summary.items()}
+            counts, edges = self.histogram(site, 'latency')
+            result[site]['latency_histogram'] = {'counts': counts.tolist(), 'edges': edges.tolist()}
+        return result
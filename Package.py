@@ -1,4 +1,7 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
 from AStar import Problem, AStar
+from EventLog import EventLog, TruckStatus
 
 
 class Package:
@@ -7,39 +10,104 @@ class Package:
     \- It contains a current location for the package, a source and a destination
     """
 
-    def __init__(self, source, destination, ID, graph):
+    def __init__(self, source, destination, ID, graph, router=AStar, search=None, log=None):
         """
         Initializes a package
         :param source:
         :param destination:
+        :param router: anything with a search(problem) method -- AStar or a DistanceTable
+        :param search: the result of a search from source to destination that was already done
+                       (see create_packages), instead of searching with the router
+        :param log: the EventLog that a failed search is logged to (None for one that only prints warnings)
         """
         self.ID = ID
+        self.log = log if log is not None else EventLog()
         self.source = source
         self.destination = destination
         self.location = source
         self.path = None
         self.path_cost = 0
         self.time_spent_on_search = 0
-        self.get_path_to(self.destination, graph)
+        self.nodes_expanded = 0
+        self.search_stats = {}
+        if search is None:
+            self.get_path_to(self.destination, graph, router)
+        else:
+            self.record_search(search)
 
 
-    def get_path_to(self, destination, graph):
+    def get_path_to(self, destination, graph, router=AStar):
         """
         Gets a path to the specified destination if it exists
         :param destination:
         :return: The time that it took to perform that search
         """
-        search_time = 0
-
         problem = Problem(self.location, destination, graph)
 
-        search = AStar.search(problem)
+        search = router.search(problem)
+        self.record_search(search)
+
+    def record_search(self, search):
+        """
+        Keeps the path that a search found, and what the search cost
+        :param search: the quintuple returned by AStar.search
+        :return: N/A
+        """
+        search_time = 0
         search_successful = search[0]
         search_time += search[3]
+        self.nodes_expanded += search[4]['nodes_expanded']
+        self.search_stats = search[4]
         if search_successful:
             self.path = search[1]
             self.path_cost = search[2]
-        else:
-            print("ERROR: Search could not find a path")
+        elif self.log.warning:
+            self.log.add(0, None, TruckStatus.NO_PATH, self.source, self.ID)
         # print "Path of package s->d: " + str(self.path)
         self.time_spent_on_search += search_time
+
+
+# The graph and the router of the worker processes of create_packages, made once when the worker starts
+worker_graph = None
+worker_router = AStar
+
+
+def start_worker(graph, make_router):
+    global worker_graph, worker_router
+    worker_graph = graph
+    worker_router = make_router(graph) if make_router is not None else AStar
+
+
+def search_for_package(endpoints):
+    """
+    Runs in a worker process: searches for the path of one package with the router of the worker
+    :param endpoints: the source and the destination of the package
+    :return: the quintuple returned by the router's search
+    """
+    return worker_router.search(Problem(endpoints[0], endpoints[1], worker_graph))
+
+
+def create_packages(requests, graph, workers=None, make_router=None, log=None):
+    """
+    Creates a batch of packages, spreading their source -> destination searches over a pool of processes.
+    The graph is sent to every worker once, instead of once per search, and every worker makes its own router
+    with make_router, so the paths are the ones the simulation's router would have found one at a time.
+
+    :param requests: (ID, source, destination) of every package
+    :param graph: the graph that the router searches (a CompactGraph is the cheapest to send)
+    :param workers: the number of processes (None uses one per core)
+    :param make_router: function(graph) that makes the router, picklable (a module function or a
+                        functools.partial of one, like Simulation.make_search_router); None for AStar
+    :param log: the EventLog that failed searches are logged to
+    :return: the packages, in the same order as the requests
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    endpoints = [(source, destination) for (ID, source, destination) in requests]
+
+    with ProcessPoolExecutor(workers, initializer=start_worker, initargs=(graph, make_router)) as executor:
+        chunksize = max(1, len(endpoints) // (4 * workers))
+        searches = list(executor.map(search_for_package, endpoints, chunksize=chunksize))
+
+    return [Package(source, destination, ID, graph, search=search, log=log)
+            for (ID, source, destination), search in zip(requests, searches)]
@@ -0,0 +1,110 @@
+import time
+from collections import OrderedDict
+from AStar import AStar
+
+
+class PathCache:
+    """
+    The PathCache class remembers the most recently used paths between two nodes, so that repeated
+    searches (trucks going back to the same garage, searches from the same spot) aren't done twice.
+    The maps are undirected, so a path that is cached one way also answers the search the other way.
+    It answers search(problem) just like AStar.
+    """
+
+    def __init__(self, capacity, router=AStar):
+        """
+        Creates an empty cache
+        :param capacity: the most paths that are kept before the least recently used one is dropped
+        :param router: anything with search(problem) and search_nearest(problem) methods
+        """
+        assert capacity > 0
+        self.capacity = capacity
+        self.router = router
+        self.paths = OrderedDict()      # (source, destination) -> (path, cost), least recently used first
+
+        # Tracking
+        self.hits = 0
+        self.reverse_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, source, destination):
+        """
+        Finds a cached path between two nodes, in either direction
+        :param source: the start node
+        :param destination: the goal node
+        :return: the path (a new list, like a search gives back) and its cost, or None if the path isn't cached
+        """
+        key = (source, destination)
+        if key in self.paths:
+            self.paths.move_to_end(key)
+            self.hits += 1
+            path, cost = self.paths[key]
+            return list(path), cost
+
+        key = (destination, source)
+        if key in self.paths:
+            self.paths.move_to_end(key)
+            self.reverse_hits += 1
+            path, cost = self.paths[key]
+            return list(reversed(path)), cost
+
+        self.misses += 1
+        return None
+
+    def store(self, path, cost):
+        """
+        Adds a path to the cache, dropping the least recently used path if the cache is full
+        :param path: the path, from its source to its destination (kept as a tuple, so callers can't change it)
+        :param cost: the cost of the path
+        :return: N/A
+        """
+        self.paths[(path[0], path[-1])] = (tuple(path), cost)
+        self.paths.move_to_end((path[0], path[-1]))
+        if len(self.paths) > self.capacity:
+            self.paths.popitem(last=False)
+            self.evictions += 1
+
+    def search(self, problem):
+        """
+        Answers the problem from the cache, or searches for it and caches the result.
+          -- The heuristic of the problem doesn't matter: every admissible one gives a cheapest path
+        :param problem: An initialized object of type Problem
+        :return: the same quintuple as AStar.search
+        """
+        start_time = time.perf_counter()
+        cached = self.lookup(problem.initial_state, problem.goal_state)
+        if cached is not None:
+            stats = {'nodes_expanded': 0, 'stale_pops': 0}
+            return True, cached[0], cached[1], time.perf_counter() - start_time, stats
+
+        search = self.router.search(problem)
+        if search[0]:
+            self.store(search[1], search[2])
+            return True, search[1], search[2], time.perf_counter() - start_time, search[4]
+        return search
+
+    def search_nearest(self, problem):
+        """
+        Multi-goal searches aren't cached, but the path to the goal they find is
+        :param problem: An initialized object of type MultiGoalProblem
+        :return: the same sextuple as AStar.search_nearest
+        """
+        search = self.router.search_nearest(problem)
+        if search[0]:
+            self.store(search[2], search[3])
+        return search
+
+    def statistics(self):
+        """
+        The counters of the cache, to help decide how big it should be
+        :return: a dictionary of the counters
+        """
+        lookups = self.hits + self.reverse_hits + self.misses
+        return {'capacity': self.capacity,
+                'size': len(self.paths),
+                'hits': self.hits,
+                'reverse_hits': self.reverse_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': (self.hits + self.reverse_hits) / float(lookups) if lookups else 0.0}
@@ -0,0 +1,177 @@
+import cProfile
+import os
+import sys
+import threading
+import time
+
+MODES = ('off', 'spans', 'cprofile', 'sample')
+
+
+class NoSpan:
+    """
+    What Profiler.span gives back when profiling is off: entering and leaving it does nothing
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+NO_SPAN = NoSpan()
+
+
+class Span:
+    """
+    One named phase of a run, as a context manager (see Profiler.span)
+    """
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler.enter(self.name)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler.leave(self.name)
+        return False
+
+
+class Profiler:
+    """
+    The Profiler class times the named phases (spans) of a run: making the graph, the packages,
+    every tick and every frame that is rendered. Spans can be inside of each other, and the time of
+    a span includes the spans inside of it.
+      -- 'spans' only counts and times the spans
+      -- 'cprofile' also runs a cProfile.Profile per span name, on the thread that made the profiler
+         (only the innermost span is profiled, so the time of a function goes to one phase)
+      -- 'sample' also looks at the stack of every thread that is in a span every interval seconds, and
+         writes the stacks per span name in the collapsed format of flamegraph.pl (one 'a;b;c count' per line)
+      -- 'off' does nothing: span() hands back the same empty context manager every time
+    """
+
+    def __init__(self, mode='off', directory='profile', interval=0.001):
+        """
+        :param mode: one of MODES
+        :param directory: where write() puts the cProfile stats and the collapsed stacks
+        :param interval: seconds between samples, for 'sample'
+        """
+        assert mode in MODES
+        self.mode = mode
+        self.directory = directory
+        self.interval = interval
+        self.thread = threading.get_ident()
+        self.active = {}            # thread ID -> the names of the spans it is in, innermost last
+        self.profiles = {}          # span name -> cProfile.Profile
+        self.stacks = {}            # span name -> collapsed stack -> number of samples
+        self.started = {}           # (thread ID, depth) -> when the span at that depth started
+
+        # Tracking
+        self.counts = {}            # span name -> the number of times it was entered
+        self.totals = {}            # span name -> the time spent in it
+
+        self.sampler = None
+        if mode == 'sample':
+            self.sampling = True
+            self.sampler = threading.Thread(target=self.sample, name='Profiler')
+            self.sampler.daemon = True
+            self.sampler.start()
+
+    def span(self, name):
+        """
+        :param name: the name of the phase
+        :return: a context manager that times the phase
+        """
+        if self.mode == 'off':
+            return NO_SPAN
+        return Span(self, name)
+
+    def enter(self, name):
+        """
+        Starts a span on the current thread
+        :return: N/A
+        """
+        thread = threading.get_ident()
+        stack = self.active.setdefault(thread, [])
+        if self.mode == 'cprofile' and thread == self.thread:
+            if stack:
+                self.profiles[stack[-1]].disable()
+            if name not in self.profiles:
+                self.profiles[name] = cProfile.Profile()
+            self.profiles[name].enable()
+        stack.append(name)
+        self.started[(thread, len(stack))] = time.perf_counter()
+
+    def leave(self, name):
+        """
+        Ends the innermost span of the current thread
+        :return: N/A
+        """
+        thread = threading.get_ident()
+        stack = self.active[thread]
+        elapsed = time.perf_counter() - self.started.pop((thread, len(stack)))
+        stack.pop()
+        self.counts[name] = self.counts.get(name, 0) + 1
+        self.totals[name] = self.totals.get(name, 0) + elapsed
+        if self.mode == 'cprofile' and thread == self.thread:
+            self.profiles[name].disable()
+            if stack:
+                self.profiles[stack[-1]].enable()
+
+    def sample(self):
+        """
+        The sampler thread: adds the stack of every thread that is in a span to the innermost span's stacks
+        :return: N/A
+        """
+        while self.sampling:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            for thread, stack in list(self.active.items()):
+                innermost = stack[-1:]      # the thread can leave its span while this runs
+                if not innermost or thread not in frames:
+                    continue
+                names = []
+                frame = frames[thread]
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(os.path.splitext(os.path.basename(code.co_filename))[0] + '.' + code.co_name)
+                    frame = frame.f_back
+                collapsed = ';'.join(reversed(names))
+                stacks = self.stacks.setdefault(innermost[0], {})
+                stacks[collapsed] = stacks.get(collapsed, 0) + 1
+
+    def close(self):
+        """
+        Stops the sampler
+        :return: N/A
+        """
+        if self.sampler is not None:
+            self.sampling = False
+            self.sampler.join()
+            self.sampler = None
+
+    def write(self):
+        """
+        Writes directory/<span>.prof (cProfile stats, for pstats or snakeviz) or directory/<span>.folded
+        (collapsed stacks, for flamegraph.pl or speedscope) for every span name
+        :return: the files that were written
+        """
+        self.close()
+        written = []
+        if self.profiles or self.stacks:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+        for name, profile in self.profiles.items():
+            filename = os.path.join(self.directory, name + '.prof')
+            profile.dump_stats(filename)
+            written.append(filename)
+        for name, stacks in self.stacks.items():
+            filename = os.path.join(self.directory, name + '.folded')
+            with open(filename, 'w') as f:
+                for collapsed, count in sorted(stacks.items()):
+                    f.write(collapsed + ' ' + str(count) + '\n')
+            written.append(filename)
+        return written
@@ -0,0 +1,237 @@
+import collections
+import os
+import threading
+import time
+import numpy
+from PIL import Image
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from Profiler import Profiler
+
+
+class Renderer:
+    """
+    The Renderer class draws the iterations of a simulation to png files without slowing the simulation down.
+      -- The map (every node and edge, and the garages) never changes, so it is drawn once, and every frame
+         starts from a copy of that picture. Only the trucks, the packages and the routes are drawn per frame.
+      -- The drawing happens on a worker thread, with its own Agg canvas (no pyplot, so no window is needed).
+         The simulation only copies what it needs into a frame and puts it in a bounded queue; when the queue
+         is full, every other frame in the queue is thrown away and from then on only every other iteration
+         is handed over (then every 4th, and so on). The frames that are drawn are spread evenly over the
+         whole run, instead of stopping when the queue first fills up. With block set, the simulation waits
+         for the worker instead, and every frame is drawn.
+      -- Frames can be written to png files, pushed into a giffify.Encoder straight from the canvas, or both.
+    Call close() at the end of the run to wait for the frames that are still in the queue.
+    """
+
+    def __init__(self, graph, garages, directory='Simulation', base_name='sim', queue_size=64, size=30, dpi=50,
+                 save_frames=True, encoder=None, profiler=None, block=False):
+        """
+        Draws the map and starts the worker
+        :param graph: the map (networkx graph with (x, y) nodes)
+        :param garages: the garages of the simulation
+        :param directory: where the frames are written (made if it isn't there)
+        :param base_name: frame i is written to directory/base_name + i + .png
+        :param queue_size: the most frames that can wait for the worker before they are thinned out
+        :param size: the width and height of the picture, in inches
+        :param dpi: the dots per inch of the picture
+        :param save_frames: write every frame to a png file
+        :param encoder: a giffify.Encoder that every frame is pushed into (None for no movie)
+        :param profiler: a Profiler that the drawing of every frame is a 'rendering' span of
+        :param block: wait for room in the queue instead of leaving frames out
+        """
+        self.directory = directory
+        self.base_name = base_name
+        self.save_frames = save_frames
+        self.encoder = encoder
+        self.profiler = profiler if profiler is not None else Profiler()
+        self.frames = collections.deque()   # the frames waiting for the worker, oldest first
+        self.queue_size = queue_size
+        self.changed = threading.Condition()    # notified whenever a frame is added to or taken from frames
+        self.block = block
+        self.stride = 1             # only iterations that are a multiple of this are handed to the worker
+        self.error = None
+
+        # Tracking
+        self.frames_submitted = 0
+        self.frames_drawn = 0
+        self.frames_dropped = 0
+        self.time_spent_drawing = 0
+
+        if save_frames and not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.draw_map(graph, garages, size, dpi)
+        self.worker = threading.Thread(target=self.work, name='Renderer')
+        self.worker.daemon = True
+        self.worker.start()
+
+    def draw_map(self, graph, garages, size, dpi):
+        """
+        Draws the static layer and keeps a copy of it, and makes the artists that change every frame
+        :return: N/A
+        """
+        self.figure = Figure(figsize=(size, size), dpi=dpi)
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.axes = self.figure.add_axes([0.02, 0.02, 0.96, 0.96])
+        self.axes.axis('off')
+
+        nodes = numpy.array(list(graph.nodes()), dtype=float).reshape(-1, 2)
+        self.axes.add_collection(LineCollection([(u, v) for u, v in graph.edges()], colors='k', linewidths=2))
+        self.axes.scatter(nodes[:, 0], nodes[:, 1], s=300, c='b', zorder=2)
+        for garage in garages:
+            self.axes.scatter([garage.location[0]], [garage.location[1]], s=500, c='k', zorder=3)
+            self.axes.text(garage.location[0], garage.location[1], 'Garage', fontsize=24,
+                           ha='center', va='center', color='w', zorder=4)
+        if len(nodes):
+            self.axes.set_xlim(nodes[:, 0].min() - 1, nodes[:, 0].max() + 1)
+            self.axes.set_ylim(nodes[:, 1].min() - 1, nodes[:, 1].max() + 1)
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+
+        self.routes = LineCollection([], colors='k', linewidths=6, linestyles='dashed', zorder=5)
+        self.package_markers = self.axes.scatter([], [], s=500, c='r', zorder=6)
+        self.truck_markers = self.axes.scatter([], [], s=500, c='y', zorder=7)
+        self.axes.add_collection(self.routes)
+        self.labels = []            # Text artists, reused from frame to frame
+
+    def submit(self, iteration, trucks, packages, packages_being_picked_up, packages_in_transit):
+        """
+        Hands the state of an iteration to the worker, or leaves it out if the worker is too far behind.
+        Only positions and IDs are copied; the route of a truck is kept by reference, since it is never changed.
+
+        :param iteration: the number of the iteration (the number of the png file)
+        :param trucks: the trucks
+        :param packages: the packages that are waiting
+        :param packages_being_picked_up: the packages that a truck is on the way to
+        :param packages_in_transit: the packages in a truck
+        :return: True if the frame will be drawn, False if it was left out
+        """
+        if self.error is not None:
+            return False
+        self.frames_submitted += 1
+        if iteration % self.stride:
+            self.frames_dropped += 1
+            return False
+        frame = (iteration,
+                 [(truck.location, truck.path, truck.path_index) for truck in trucks],
+                 [(package.ID, package.source) for package in packages] +
+                 [(package.ID, package.source) for package in packages_being_picked_up],
+                 [(package.ID, package.destination) for package in packages] +
+                 [(package.ID, package.destination) for package in packages_being_picked_up] +
+                 [(package.ID, package.destination) for package in packages_in_transit])
+        with self.changed:
+            if self.block:
+                while len(self.frames) >= self.queue_size:
+                    self.changed.wait()
+            while len(self.frames) >= self.queue_size:
+                self.thin_out()
+                if iteration % self.stride:
+                    self.frames_dropped += 1
+                    return False
+            self.frames.append(frame)
+            self.changed.notify()
+        return True
+
+    def thin_out(self):
+        """
+        Doubles the stride, and throws away the waiting frames that aren't on the new stride
+        (the caller holds the lock)
+        :return: N/A
+        """
+        self.stride *= 2
+        kept = [frame for frame in self.frames if frame[0] % self.stride == 0]
+        self.frames_dropped += len(self.frames) - len(kept)
+        self.frames.clear()
+        self.frames.extend(kept)
+
+    def work(self):
+        """
+        The worker thread: draws frames until it gets None
+        :return: N/A
+        """
+        while True:
+            with self.changed:
+                while not self.frames:
+                    self.changed.wait()
+                frame = self.frames.popleft()
+                self.changed.notify()
+            if frame is None:
+                return
+            if self.error is not None:
+                continue
+            try:
+                start_time = time.perf_counter()
+                with self.profiler.span('rendering'):
+                    drawn = self.draw_frame(*frame)
+                if drawn:
+                    self.frames_drawn += 1
+                self.time_spent_drawing += time.perf_counter() - start_time
+            except Exception as error:
+                self.error = error
+
+    def draw_frame(self, iteration, trucks, sources, destinations):
+        """
+        Draws one frame on top of the static layer, and writes it to its png file and/or the encoder
+        :param iteration: the number of the iteration
+        :param trucks: (location, path, path_index) of every truck
+        :param sources: (package ID, source) of every package that hasn't been picked up
+        :param destinations: (package ID, destination) of every package that hasn't been delivered
+        :return: True if the frame was drawn, False if nothing wanted it
+        """
+        if not self.save_frames and (self.encoder is None or not self.encoder.wanted()):
+            if self.encoder is not None:
+                self.encoder.push(None)
+            return False
+
+        routes = []
+        for location, path, path_index in trucks:
+            previous = location
+            for node in path[path_index:]:
+                routes.append((previous, node))
+                previous = node
+        self.routes.set_segments(routes)
+        places = [source for ID, source in sources] + [destination for ID, destination in destinations]
+        self.package_markers.set_offsets(numpy.array(places, dtype=float).reshape(-1, 2))
+        self.truck_markers.set_offsets(numpy.array([truck[0] for truck in trucks], dtype=float).reshape(-1, 2))
+
+        labels = {}
+        for ID, source in sources:
+            labels[source] = 'P' + str(ID) + 'S'
+        for ID, destination in destinations:
+            labels[destination] = 'P' + str(ID) + 'D'
+        while len(self.labels) < len(labels):
+            self.labels.append(self.axes.text(0, 0, '', fontsize=24, ha='center', va='center', zorder=8))
+
+        self.canvas.restore_region(self.background)
+        for artist in (self.routes, self.package_markers, self.truck_markers):
+            self.axes.draw_artist(artist)
+        for text, (place, label) in zip(self.labels, labels.items()):
+            text.set_position(place)
+            text.set_text(label)
+            self.axes.draw_artist(text)
+
+        # buffer_rgba() is a flat buffer before matplotlib 3.1 and a shaped memoryview after, so it is shaped here
+        width, height = self.canvas.get_width_height()
+        picture = numpy.frombuffer(self.canvas.buffer_rgba(), numpy.uint8).reshape(height, width, 4)[:, :, :3]
+        if self.save_frames:
+            Image.fromarray(picture).save(os.path.join(self.directory, self.base_name + str(iteration) + '.png'))
+        if self.encoder is not None:
+            self.encoder.push(picture)
+        return True
+
+    def close(self):
+        """
+        Waits for the worker to draw the frames that are left, and warns if frames were left out
+        :return: N/A
+        """
+        with self.changed:
+            self.frames.append(None)
+            self.changed.notify()
+        self.worker.join()
+        if self.frames_dropped:
+            print('WARNING: the renderer fell behind and left out ' + str(self.frames_dropped) + ' of ' +
+                  str(self.frames_submitted) + ' frames (it kept every ' + str(self.stride) +
+                  'th iteration); set render_every_frame to draw them all')
+        if self.error is not None:
+            raise self.error
@@ -0,0 +1,103 @@
+import json
+import random
+import Map
+
+
+class Scenario:
+    """
+    The Scenario class describes one N-K problem: the map, and how many trucks, packages and garages are on it.
+    Everything random about the problem is drawn from the seed, so the same scenario always gives
+    the same map, the same garages, the same packages and the same trucks -- timing runs can be compared.
+    """
+
+    def __init__(self, map_width=75, map_height=33, map_noise=.4, number_of_trucks=7, number_of_packages=24,
+                 number_of_garages=4, weights=None, range_of_truck=100, seed=None):
+        """
+        Creates a scenario
+        :param map_width: number of nodes on one dimension of the map
+        :param map_height: number of nodes on the other dimension
+        :param map_noise: the fraction of nodes to delete from the map
+        :param number_of_trucks: N
+        :param number_of_packages: K
+        :param number_of_garages: how many garages the trucks are spread over
+        :param weights: the edge weight distribution (see Map.makeMap), default [(1,100)]
+        :param range_of_truck: how far a truck can go
+        :param seed: the seed of the scenario; None picks a new one (which is kept, so it can be saved)
+        """
+        if weights is None:
+            weights = [(1, 100)]
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        self.map_width = map_width
+        self.map_height = map_height
+        self.map_noise = map_noise
+        self.number_of_trucks = number_of_trucks
+        self.number_of_packages = number_of_packages
+        self.number_of_garages = number_of_garages
+        self.weights = [tuple(pair) for pair in weights]
+        self.range_of_truck = range_of_truck
+        self.seed = seed
+
+    def make_graph(self):
+        """
+        Creates the map of the scenario
+        :return: a networkx graph (see Map.makeMap)
+        """
+        return Map.makeMap(self.map_width, self.map_height, self.map_noise, self.weights, self.seed)
+
+    def place(self, graph):
+        """
+        Picks the locations of everything on the map of the scenario
+        :param graph: the map made by make_graph()
+        :return: Triple:
+                    garages:    - the location of every garage
+                    packages:   - the (source, destination) of every package
+                    trucks:     - the number of the home garage of every truck
+        """
+        r = random.Random(self.seed)
+        nodes = sorted(graph.nodes())
+        garages = [r.choice(nodes) for _ in range(self.number_of_garages)]
+        packages = [(r.choice(nodes), r.choice(nodes)) for _ in range(self.number_of_packages)]
+        trucks = [r.randrange(self.number_of_garages) for _ in range(self.number_of_trucks)]
+        return garages, packages, trucks
+
+    def to_dict(self):
+        """
+        :return: the scenario as a dictionary that can be written as JSON
+        """
+        return {'map_width': self.map_width,
+                'map_height': self.map_height,
+                'map_noise': self.map_noise,
+                'number_of_trucks': self.number_of_trucks,
+                'number_of_packages': self.number_of_packages,
+                'number_of_garages': self.number_of_garages,
+                'weights': [list(pair) for pair in self.weights],
+                'range_of_truck': self.range_of_truck,
+                'seed': self.seed}
+
+    @staticmethod
+    def from_dict(d):
+        """
+        :param d: a dictionary made by to_dict()
+        :return: the scenario
+        """
+        return Scenario(**d)
+
+    def save(self, filename):
+        """
+        Writes the scenario to a JSON file
+        :param filename: the file to write
+        :return: N/A
+        """
+        with open(filename, 'w') as f:
+            json.dump(self.to_dict(), f, indent=4, sort_keys=True)
+
+    @staticmethod
+    def load(filename):
+        """
+        Reads a scenario that was written by save()
+        :param filename: the file to read
+        :return: the scenario
+        """
+        with open(filename) as f:
+            return Scenario.from_dict(json.load(f))
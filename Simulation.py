@@ -0,0 +1,613 @@
+import argparse
+import functools
+import heapq
+import json
+import os
+import sys
+import time
+import giffify
+from Garage import Garage
+from Package import Package, create_packages
+from Truck import Truck
+from AStar import AStar, BidirectionalAStar
+from JumpPointSearch import JumpPointSearch
+from HPAStar import HPAStar
+from Landmarks import Landmarks
+from ContractionHierarchy import ContractionHierarchy
+from CompactGraph import CompactGraph
+from DistanceTable import DistanceTable
+from Dispatcher import Dispatcher
+from EventLog import EventLog, LEVELS
+from Metrics import SearchMetrics, SITES
+from Profiler import Profiler, MODES
+from PathCache import PathCache
+from Renderer import Renderer
+from Scenario import Scenario
+from String_Formatting import *
+
+# Settings used when the simulation is run as a script
+scenario_file = None    # a file written by Scenario.save() -- replaces the scenario settings below
+scenario_seed = None    # None picks a new seed every run (it is printed at the end)
+save_scenario_to = None
+map_width = 75
+map_height = 33
+map_noise = .4
+number_of_packages = 24
+number_of_trucks = 7
+number_of_garages = 4
+range_of_truck = 100
+search_algorithm = 'astar'  # what answers the searches that aren't in the distance table, see SEARCH_ALGORITHMS
+landmarks_file = None   # a .npz file that keeps the landmark tables of the 'alt' search between runs on the same map
+use_distance_table = True
+path_cache_size = 256
+use_compact_graph = True
+package_workers = 1     # processes that search for the package paths (only used without a distance table)
+event_driven = True     # only wake trucks up when they get somewhere, instead of moving them a node at a time
+dispatch = 'batched'    # 'greedy': every idle truck takes its closest package, 'assignment' or 'batched': see Dispatcher
+log_level = 'off'       # what the trucks do is kept in the event log from this level up: see EventLog.LEVELS
+log_file = None         # a JSON lines file that the event log is written to at the end
+profile = 'off'         # 'spans' times the phases of the run, 'cprofile' and 'sample' also profile them: see Profiler
+profile_directory = 'profile'
+draw_simulation = True
+save_frames = False     # write every frame that is drawn to Simulation/simN.png
+render_every_frame = False  # wait for the renderer when it falls behind, instead of leaving frames out
+make_gif = True         # push the frames that are drawn into gif_file as they are drawn
+gif_file = os.path.join('Simulation', 'sim.gif')    # .mp4 works too, with imageio's ffmpeg plugin
+gif_every = 1           # only every gif_every'th frame goes into the gif
+gif_max_frames = 300
+
+DISPATCH_METHODS = ('greedy', 'assignment', 'batched')
+
+# The single goal searches that a Simulation can be run with:
+# name -> function(search graph, landmarks file) that makes the search
+SEARCH_ALGORITHMS = {'astar': lambda graph, landmarks_file: AStar,
+                     'bidirectional': lambda graph, landmarks_file: BidirectionalAStar,
+                     'jps': lambda graph, landmarks_file: JumpPointSearch,
+                     'hpa': lambda graph, landmarks_file: HPAStar(graph),
+                     'alt': lambda graph, landmarks_file: Landmarks.prepare(graph, filename=landmarks_file),
+                     'ch': lambda graph, landmarks_file: ContractionHierarchy(graph)}
+
+
+def make_search_router(graph, search_algorithm='astar', path_cache_size=0, landmarks_file=None):
+    """
+    Makes the search that a simulation routes with when there is no distance table (or that the table falls back
+    on). It is a module function so that the worker processes of Package.create_packages can make the same one.
+    :param graph: the search graph
+    :param search_algorithm: the name of the search in SEARCH_ALGORITHMS
+    :param path_cache_size: the size of the PathCache in front of the search (0 for none)
+    :param landmarks_file: where the 'alt' search keeps its landmark tables
+    :return: the search, behind a PathCache if path_cache_size is set
+    """
+    r = SEARCH_ALGORITHMS[search_algorithm](graph, landmarks_file)
+    if path_cache_size:
+        r = PathCache(path_cache_size, r)
+    return r
+
+
+class Simulation:
+    """
+    The Simulation class runs one scenario of the N-K problem.
+    It owns the map, the garages, the trucks and the packages (by what is happening to them),
+    and keeps track of how long every part of the run took.
+    Simulations don't share anything, so any number of them can be run one after the other,
+    and a map (or a whole router) made for one of them can be handed to the next one.
+    """
+
+    def __init__(self, scenario, use_distance_table=True, path_cache_size=256, use_compact_graph=True,
+                 draw_simulation=False, graph=None, search_graph=None, router=None, package_workers=1,
+                 event_driven=False, dispatch='greedy', search_algorithm='astar', landmarks_file=None,
+                 save_frames=True, encoder=None, log=None, profiler=None, render_every_frame=False):
+        """
+        Creates the map, the garages, the router, the packages and the trucks of the scenario
+        :param scenario: the Scenario to run
+        :param use_distance_table: precompute a DistanceTable between the garages and the packages
+        :param path_cache_size: how many paths to keep in a PathCache in front of AStar (0 for none)
+        :param use_compact_graph: search a CompactGraph copy of the map instead of the map itself
+        :param draw_simulation: draw every iteration of the run with a Renderer
+        :param graph: the map of the scenario, if it was already made
+        :param search_graph: the graph to search, if it was already made
+        :param router: what answers the searches (anything with search and search_nearest), if it was already made
+        :param package_workers: search for the package paths with this many processes (see Package.create_packages),
+                                each with its own copy of the search of the router; not used when the router is a
+                                DistanceTable that already has the paths, or was handed in (it can't be remade)
+        :param event_driven: run() with run_events() instead of run_ticks()
+        :param search_algorithm: the name of the search in SEARCH_ALGORITHMS that the router is built on
+        :param landmarks_file: where the 'alt' search loads its landmark tables from (or saves them to, the first time)
+        :param dispatch: 'greedy' lets every idle truck take its closest package in turn, 'assignment' and 'batched'
+                         hand out the packages to all of the idle trucks at once with a Dispatcher using that method
+        :param save_frames: the renderer writes every frame to a png file
+        :param encoder: a giffify.Encoder that the renderer pushes every frame into (None for no movie)
+        :param log: the EventLog that the trucks log to (None for one that only prints warnings)
+        :param profiler: the Profiler that times the phases of the run (None for one that is off)
+        :param render_every_frame: the simulation waits for the renderer instead of it leaving frames out
+        """
+        assert dispatch in DISPATCH_METHODS
+        self.scenario = scenario
+        self.search_algorithm = search_algorithm
+        self.landmarks_file = landmarks_file
+        self.use_distance_table = use_distance_table
+        self.path_cache_size = path_cache_size
+        self.package_workers = package_workers
+        self.use_compact_graph = use_compact_graph
+        self.draw_simulation = draw_simulation
+        self.save_frames = save_frames
+        self.encoder = encoder
+        self.render_every_frame = render_every_frame
+        self.renderer = None
+        self.log = log if log is not None else EventLog()
+        self.profiler = profiler if profiler is not None else Profiler()
+        self.event_driven = event_driven
+        self.dispatch_method = dispatch
+        self.dispatcher = Dispatcher(self, dispatch) if dispatch != 'greedy' else None
+
+        # The packages that are waiting, being picked up and in transit are kept by ID, so that a package
+        # can be moved from one to the next without searching a list for it
+        self.packages = dict()
+        self.packages_being_picked_up = dict()
+        self.packages_in_transit = dict()
+        self.delivered_packages = list()
+        self.trucks = list()
+        self.garages = list()
+        self.iterations = 0
+        self.simulated_time = 0
+
+        # Tracking
+        self.timings = {'graph': 0, 'garages': 0, 'router': 0, 'packages': 0, 'trucks': 0, 'searching': 0,
+                        'simulation': 0, 'total': 0}
+        self.nodes_expanded = 0
+        self.metrics = SearchMetrics()
+
+        start_of_scenario = time.perf_counter()
+
+        t = time.perf_counter()
+        with self.profiler.span('graph'):
+            self.graph = graph if graph is not None else scenario.make_graph()
+            self.search_graph = search_graph if search_graph is not None else self.create_search_graph()
+        self.timings['graph'] = time.perf_counter() - t
+        garage_locations, package_locations, truck_garages = scenario.place(self.graph)
+
+        # Create all of the garages
+        t = time.perf_counter()
+        for ID in range(scenario.number_of_garages):
+            self.garages.append(Garage(garage_locations[ID], ID))
+        self.timings['garages'] = time.perf_counter() - t
+
+        # Precompute the routes between every place a truck has to stop at
+        t = time.perf_counter()
+        locations = [location for pair in package_locations for location in pair]
+        locations += garage_locations
+        with self.profiler.span('router'):
+            self.router = router if router is not None else self.create_router(locations)
+        self.timings['router'] = time.perf_counter() - t
+
+        # Create all of the packages
+        t = time.perf_counter()
+        with self.profiler.span('packages'):
+            if package_workers > 1 and router is None and not isinstance(self.router, DistanceTable):
+                requests = [(ID, source, destination) for ID, (source, destination) in enumerate(package_locations)]
+                make_router = functools.partial(make_search_router, search_algorithm=self.search_algorithm,
+                                                path_cache_size=self.path_cache_size,
+                                                landmarks_file=self.landmarks_file)
+                for package in create_packages(requests, self.search_graph, package_workers, make_router, self.log):
+                    self.packages[package.ID] = package
+            else:
+                for ID in range(scenario.number_of_packages):
+                    source, destination = package_locations[ID]
+                    self.packages[ID] = Package(source, destination, ID, self.search_graph, self.router,
+                                                log=self.log)
+        for package in self.packages.values():
+            self.record_search('package_setup', package.time_spent_on_search, package.search_stats,
+                               package.path is not None, package.path)
+        self.timings['packages'] = time.perf_counter() - t
+
+        # Create all of the trucks
+        t = time.perf_counter()
+        for ID in range(scenario.number_of_trucks):
+            self.trucks.append(Truck(self.garages[truck_garages[ID]], scenario.range_of_truck, ID, self))
+        self.timings['trucks'] = time.perf_counter() - t
+
+        self.timings['total'] = time.perf_counter() - start_of_scenario
+
+    def create_search_graph(self):
+        """
+        Creates the graph that all of the searches run on (the map itself is still used for drawing)
+        :return: a CompactGraph copy of the map if use_compact_graph is set, otherwise the map
+        """
+        if self.use_compact_graph:
+            return CompactGraph.from_networkx(self.graph)
+        return self.graph
+
+    def create_router(self, locations):
+        """
+        Creates whatever answers the searches of the scenario
+        :param locations: the package sources, package destinations and garage locations
+        :return: the search_algorithm, behind a PathCache if path_cache_size is set, behind a DistanceTable
+                 between the locations if use_distance_table is set
+        """
+        r = make_search_router(self.search_graph, self.search_algorithm, self.path_cache_size, self.landmarks_file)
+        if self.use_distance_table:
+            r = DistanceTable(self.search_graph, locations, r)
+        return r
+
+    def trucks_are_home(self):
+        for garage in self.garages:
+            if not garage.all_trucks_home():
+                return False
+        return True
+
+    def all_packages_are_being_delivered(self):
+        if len(self.packages) == 0:
+            return True
+        return False
+
+    def claim_package(self, package):
+        """
+        Takes a package off of the waiting packages once a truck is on its way to pick it up
+        :param package: the package
+        :return: N/A
+        """
+        self.packages_being_picked_up[package.ID] = self.packages.pop(package.ID)
+
+    def add_time_spent_searching(self, time_difference, nodes_expanded=0):
+        self.timings['searching'] += time_difference
+        self.nodes_expanded += nodes_expanded
+
+    def record_search(self, site, runtime, stats, found, path=None):
+        """
+        Adds a search to the searching time and to the metrics of the site that it was made from
+        :param site: where the search was made from (see Metrics.SITES)
+        :param runtime: how long it took
+        :param stats: the stats dictionary that it returned
+        :param found: False if it didn't find a path
+        :param path: the path that it found, if it found a single one
+        :return: N/A
+        """
+        self.add_time_spent_searching(runtime, stats.get('nodes_expanded', 0))
+        self.metrics.record(site, runtime, stats, found, path)
+
+    def dispatch(self, trucks):
+        """
+        Hands out packages to the trucks that are about to look for one, if there is a dispatcher
+        :param trucks: the trucks that are about to make a decision
+        :return: N/A
+        """
+        if self.dispatcher is not None:
+            with self.profiler.span('dispatch'):
+                self.dispatcher.assign([truck for truck in trucks if truck.destination_reached() and truck.idle()])
+
+    def run(self):
+        """
+        Runs the scenario until every package has been delivered
+        :return: the number of iterations that it took
+        """
+        print("Running scenario:")
+        t = time.perf_counter()
+        if self.draw_simulation:
+            self.renderer = Renderer(self.graph, self.garages, save_frames=self.save_frames, encoder=self.encoder,
+                                     profiler=self.profiler, block=self.render_every_frame)
+        if self.event_driven:
+            self.run_events()
+        else:
+            self.run_ticks()
+        if self.renderer is not None:
+            self.renderer.close()
+        self.timings['simulation'] = time.perf_counter() - t
+        self.timings['total'] += self.timings['simulation']
+        return self.iterations
+
+    def run_ticks(self):
+        """
+        Every iteration, every truck either makes a decision or moves one node along its route
+        :return: N/A
+        """
+        packages_to_deliver = len(self.packages)
+        while packages_to_deliver != len(self.delivered_packages) and self.trucks_are_home():
+            with self.profiler.span('tick'):
+                self.dispatch(self.trucks)
+                for truck in self.trucks:
+                    truck.find_route()
+                self.draw()
+            self.iterations += 1
+        self.simulated_time = self.iterations
+
+    def run_events(self):
+        """
+        Trucks only do something when they get to the end of their route: to a package, to where a package
+        is going, or back to their garage. The time that they get there is known as soon as the route is,
+        so the trucks wait in a priority queue of (arrival time, truck ID) instead of being moved node by node.
+          -- Making a decision takes one unit of time, and driving a route takes its path cost.
+          -- An iteration is every decision that is made at the same time.
+        :return: N/A
+        """
+        events = [(0, truck.ID) for truck in self.trucks]
+        heapq.heapify(events)
+        packages_to_deliver = len(self.packages)
+        while events and packages_to_deliver != len(self.delivered_packages):
+            with self.profiler.span('tick'):
+                now = events[0][0]
+                due = []
+                while events and events[0][0] == now:
+                    truck = self.trucks[heapq.heappop(events)[1]]
+                    truck.arrive()
+                    due.append(truck)
+                self.dispatch(due)
+                for truck in due:
+                    truck.find_next_destination()
+                    if not truck.destination_reached():
+                        heapq.heappush(events, (now + 1 + truck.path_cost, truck.ID))
+                    elif not (truck.idle() and truck.at_garage() and self.all_packages_are_being_delivered()):
+                        heapq.heappush(events, (now + 1, truck.ID))
+                self.simulated_time = now
+                self.draw()
+            self.iterations += 1
+
+    def draw(self):
+        """
+        Hands the current iteration to the renderer, if draw_simulation is set (it is drawn on another thread)
+        :return: N/A
+        """
+        if self.renderer is not None:
+            self.renderer.submit(self.iterations, self.trucks, self.packages.values(),
+                                 self.packages_being_picked_up.values(), self.packages_in_transit.values())
+
+    def results(self):
+        """
+        The measurements of the run, for Benchmark.py
+        :return: a dictionary that can be written as JSON
+        """
+        return {'scenario': self.scenario.to_dict(),
+                'search_algorithm': self.search_algorithm,
+                'use_distance_table': self.use_distance_table,
+                'event_driven': self.event_driven,
+                'dispatch': self.dispatch_method,
+                'package_workers': self.package_workers,
+                'search_metrics': self.metrics.to_dict(),
+                'profile': {name: {'count': self.profiler.counts[name], 'total': self.profiler.totals[name]}
+                            for name in self.profiler.counts},
+                'iterations': self.iterations,
+                'simulated_time': self.simulated_time,
+                'time_total': self.timings['total'],
+                'time_graph': self.timings['graph'],
+                'time_router': self.timings['router'],
+                'time_packages': self.timings['packages'],
+                'time_searching': self.timings['searching'],
+                'time_simulation': self.timings['simulation'],
+                'nodes_expanded': self.nodes_expanded,
+                'router_nodes_expanded': self.router.nodes_expanded if isinstance(self.router, DistanceTable) else 0,
+                'peak_memory_kb': peak_memory(),
+                'total_distance': sum(truck.distance_traveled for truck in self.trucks),
+                'packages_delivered': len(self.delivered_packages)}
+
+    def print_summary(self):
+        """
+        Prints the table of the problem variables and the time that every part of the run took
+        :return: N/A
+        """
+        table_width = len('|----------------------------------|')
+        precision = 3
+        scenario = self.scenario
+
+        print('\n\n')
+        print('\n\n')
+        print('|----------------------------------|')
+        print('| Problem variables                |')
+        print('|----------------------------------|')
+        print(format_coordinate('Graph dimensions:', scenario.map_width, scenario.map_height, table_width))
+        print(format_string('Graph noise:', str(scenario.map_noise), table_width))
+        print(format_string('Number of packages:', str(scenario.number_of_packages), table_width))
+        print(format_string('Number of trucks:', str(scenario.number_of_trucks), table_width))
+        print(format_string('Number of garages:', str(scenario.number_of_garages), table_width))
+        print(format_string('Seed:', str(scenario.seed), table_width))
+        print('|----------------------------------|')
+        print('| TIME to complete                 |')
+        print('|----------------------------------|')
+        print(format_number_string('Total time: ', self.timings['total'], precision, table_width))
+        print(format_number_string('Graph creation: ', self.timings['graph'], precision, table_width))
+        print(format_number_string('Making packages: ', self.timings['packages'], precision, table_width))
+        print(format_number_string('Making garages: ', self.timings['garages'], precision, table_width))
+        print(format_number_string('Making router: ', self.timings['router'], precision, table_width))
+        print(format_number_string('Making trucks:', self.timings['trucks'], precision, table_width))
+        print(format_number_string('Searching: ', self.timings['searching'], precision, table_width))
+        print(format_number_string('Simulation: ', self.timings['simulation'], precision, table_width))
+        print('|----------------------------------|')
+        router = self.router
+        if isinstance(router, DistanceTable):
+            print('| DISTANCE TABLE                   |')
+            print('|----------------------------------|')
+            print(format_string('Locations:', len(router.nodes), table_width))
+            print(format_number_string('Build time: ', router.build_time, precision, table_width))
+            print(format_string('Nodes expanded:', router.nodes_expanded, table_width))
+            print(format_number_string('Memory (KB): ', router.memory_usage() / 1024.0, precision, table_width))
+            print('|----------------------------------|')
+        cache = router.fallback if isinstance(router, DistanceTable) else router
+        search = cache.router if isinstance(cache, PathCache) else cache
+        if isinstance(search, HPAStar):
+            print('| HPA*                             |')
+            print('|----------------------------------|')
+            print(format_string('Cluster size:', search.cluster_size, table_width))
+            print(format_string('Entrance width:', search.entrance_width, table_width))
+            print(format_string('Abstract nodes:', search.abstract.number_of_nodes(), table_width))
+            print(format_number_string('Build time: ', search.build_time, precision, table_width))
+            print(format_string('Nodes expanded:', search.nodes_expanded, table_width))
+            print('|----------------------------------|')
+        if isinstance(search, ContractionHierarchy):
+            print('| CONTRACTION HIERARCHY            |')
+            print('|----------------------------------|')
+            print(format_string('Shortcuts:', search.shortcuts, table_width))
+            print(format_number_string('Build time: ', search.build_time, precision, table_width))
+            print(format_number_string('Memory (KB): ', search.memory_usage() / 1024.0, precision, table_width))
+            print('|----------------------------------|')
+        if isinstance(search, Landmarks):
+            print('| LANDMARKS                        |')
+            print('|----------------------------------|')
+            print(format_string('Landmarks:', search.count, table_width))
+            print(format_number_string('Build time: ', search.build_time, precision, table_width))
+            print(format_number_string('Memory (KB): ', search.memory_usage() / 1024.0, precision, table_width))
+            print('|----------------------------------|')
+        if isinstance(cache, PathCache):
+            cache_statistics = cache.statistics()
+            print('| PATH CACHE                       |')
+            print('|----------------------------------|')
+            print(format_string('Capacity:', cache_statistics['capacity'], table_width))
+            print(format_string('Hits:', cache_statistics['hits'], table_width))
+            print(format_string('Reverse hits:', cache_statistics['reverse_hits'], table_width))
+            print(format_string('Misses:', cache_statistics['misses'], table_width))
+            print(format_string('Evictions:', cache_statistics['evictions'], table_width))
+            print(format_number_string('Hit rate: ', cache_statistics['hit_rate'], precision, table_width))
+            print('|----------------------------------|')
+        if self.dispatcher is not None:
+            print('| DISPATCHER                       |')
+            print('|----------------------------------|')
+            print(format_string('Rounds:', self.dispatcher.rounds, table_width))
+            print(format_string('Searches:', self.dispatcher.searches, table_width))
+            print('|----------------------------------|')
+        for site in SITES:
+            if not self.metrics.count(site):
+                continue
+            latency = self.metrics.percentiles(site, 'latency')
+            expanded = self.metrics.percentiles(site, 'nodes_expanded')
+            frontier = self.metrics.percentiles(site, 'max_frontier')
+            length = self.metrics.percentiles(site, 'path_length')
+            print(format_string('SEARCHES: ' + site, '', table_width))
+            print('|----------------------------------|')
+            print(format_string('Searches:', self.metrics.count(site), table_width))
+            print(format_string('Failures:', self.metrics.failures[site], table_width))
+            print(format_number_string('Total time: ', self.metrics.total(site, 'latency'), precision, table_width))
+            for p in ('p50', 'p90', 'p99', 'max'):
+                print(format_number_string('Latency ' + p + ' (ms): ', 1000 * latency[p], precision, table_width))
+            if expanded is not None:
+                print(format_string('Expanded p50 / p99:', str(int(expanded['p50'])) + ' / ' +
+                                    str(int(expanded['p99'])), table_width))
+            if frontier is not None:
+                print(format_string('Max frontier:', int(frontier['max']), table_width))
+            if length is not None:
+                print(format_string('Path length p50:', int(length['p50']), table_width))
+            print('|----------------------------------|')
+        if self.profiler.counts:
+            print('| PROFILE                          |')
+            print('|----------------------------------|')
+            for name in sorted(self.profiler.totals, key=self.profiler.totals.get, reverse=True):
+                print(format_number_string(name + ' (' + str(self.profiler.counts[name]) + '): ',
+                                           self.profiler.totals[name], precision, table_width))
+            print('|----------------------------------|')
+        if self.log.records:
+            print('| EVENT LOG                        |')
+            print('|----------------------------------|')
+            print(format_string('Records made:', self.log.records_made, table_width))
+            print(format_string('Records kept:', len(self.log.records), table_width))
+            print('|----------------------------------|')
+        if self.renderer is not None:
+            print('| RENDERER                         |')
+            print('|----------------------------------|')
+            print(format_string('Frames drawn:', self.renderer.frames_drawn, table_width))
+            print(format_string('Frames dropped:', self.renderer.frames_dropped, table_width))
+            print(format_number_string('Drawing time: ', self.renderer.time_spent_drawing, precision, table_width))
+            print('|----------------------------------|')
+
+
+def peak_memory():
+    """
+    The most memory that the process has used so far
+    :return: the peak resident set size in KB, or None where the platform can't tell
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        peak /= 1024        # bytes on macOS, KB everywhere else
+    return peak
+
+
+def create_scenario():
+    """
+    Creates the scenario that is run
+    :return: the scenario from scenario_file if it is set, otherwise one made from the settings above
+    """
+    if scenario_file is not None:
+        return Scenario.load(scenario_file)
+    return Scenario(map_width, map_height, map_noise, number_of_trucks, number_of_packages, number_of_garages,
+                    range_of_truck=range_of_truck, seed=scenario_seed)
+
+
+def main():
+    global scenario_file, search_algorithm, use_distance_table, draw_simulation, make_gif, log_level, log_file, \
+        profile, profile_directory, event_driven, dispatch, package_workers
+
+    parser = argparse.ArgumentParser(description='Runs an N-K scenario.')
+    parser.add_argument('--scenario', help='a scenario file written by Scenario.save(), replaces scenario_file')
+    parser.add_argument('--results', help='writes the measurements of the run to this JSON file')
+    parser.add_argument('--headless', action='store_true', help="doesn't draw the simulation or make a gif")
+    parser.add_argument('--search', choices=sorted(SEARCH_ALGORITHMS), help='replaces search_algorithm')
+    parser.add_argument('--no-distance-table', action='store_true', help='sets use_distance_table to False')
+    parser.add_argument('--event-driven', dest='event_driven', action='store_true', default=None,
+                        help='sets event_driven to True')
+    parser.add_argument('--no-event-driven', dest='event_driven', action='store_false', default=None,
+                        help='sets event_driven to False (the tick engine)')
+    parser.add_argument('--dispatch', choices=DISPATCH_METHODS, help='replaces dispatch')
+    parser.add_argument('--package-workers', type=int, help='replaces package_workers')
+    parser.add_argument('--log-level', choices=sorted(LEVELS), help='replaces log_level')
+    parser.add_argument('--log-file', help='replaces log_file')
+    parser.add_argument('--profile', choices=MODES, help='replaces profile')
+    parser.add_argument('--profile-dir', help='replaces profile_directory')
+    arguments = parser.parse_args()
+    if arguments.scenario is not None:
+        scenario_file = arguments.scenario
+    if arguments.search is not None:
+        search_algorithm = arguments.search
+    if arguments.no_distance_table:
+        use_distance_table = False
+    if arguments.event_driven is not None:
+        event_driven = arguments.event_driven
+    if arguments.dispatch is not None:
+        dispatch = arguments.dispatch
+    if arguments.package_workers is not None:
+        package_workers = arguments.package_workers
+    if arguments.log_level is not None:
+        log_level = arguments.log_level
+    if arguments.log_file is not None:
+        log_file = arguments.log_file
+    if arguments.profile is not None:
+        profile = arguments.profile
+    if arguments.profile_dir is not None:
+        profile_directory = arguments.profile_dir
+    if arguments.headless:
+        draw_simulation = False
+        make_gif = False
+
+    scenario = create_scenario()
+    if save_scenario_to is not None:
+        scenario.save(save_scenario_to)
+
+    encoder = giffify.Encoder(gif_file, gif_every, gif_max_frames) if draw_simulation and make_gif else None
+    simulation = Simulation(scenario, use_distance_table, path_cache_size, use_compact_graph, draw_simulation,
+                            package_workers=package_workers, event_driven=event_driven, dispatch=dispatch,
+                            search_algorithm=search_algorithm, landmarks_file=landmarks_file,
+                            save_frames=save_frames, encoder=encoder, log=EventLog(LEVELS[log_level]),
+                            profiler=Profiler(profile, profile_directory), render_every_frame=render_every_frame)
+    print("Created garages, router, packages and trucks")
+    simulation.run()
+    if encoder is not None:
+        encoder.close()
+    if log_file is not None:
+        simulation.log.export(log_file)
+    profile_files = simulation.profiler.write()
+    if arguments.results is not None:
+        with open(arguments.results, 'w') as f:
+            json.dump(simulation.results(), f, indent=4, sort_keys=True)
+
+    simulation.print_summary()
+    if encoder is not None:
+        table_width = len('|----------------------------------|')
+        print('| GIF                              |')
+        print('|----------------------------------|')
+        print(format_string('Frames written:', encoder.frames_written, table_width))
+        print(format_string('Frames left out:', encoder.frames_pushed - encoder.frames_written, table_width))
+        print('|----------------------------------|')
+    for filename in profile_files:
+        print('Wrote ' + filename)
+
+
+if __name__ == '__main__':
+    main()
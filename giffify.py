@@ -1,13 +1,81 @@
-from PIL import Image
+import os
 import imageio
 
-def create(base_name, i):
-    fps = (i-1)/60
-    kargs = {'duration': 0.5}
-    with imageio.get_writer('Simulation\sim.gif', mode='I', **kargs) as writer:
-        for j in range(i-1):
-            filename = base_name + str(j) + '.png'
-            frame = imageio.imread("Simulation\\" + filename)
-            writer.append_data(frame)
 
+class Encoder:
+    """
+    The Encoder class writes a gif (or an mp4, with imageio's ffmpeg plugin) one frame at a time, as the
+    frames are drawn, so they never have to be saved to png files and read back in.
+      -- every: only every nth frame pushed goes into the file (1 keeps them all)
+      -- max_frames: frames after this many are left out, so a long run doesn't make a huge file
+    """
 
+    def __init__(self, filename, every=1, max_frames=None, duration=0.5):
+        """
+        Opens the file
+        :param filename: the file to write; .gif makes a gif, anything else is written by ffmpeg
+        :param every: keep one frame out of every this many
+        :param max_frames: the most frames to write (None for no limit)
+        :param duration: how long each frame is shown, in seconds
+        """
+        assert every > 0
+        directory = os.path.dirname(filename)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.filename = filename
+        self.every = every
+        self.max_frames = max_frames
+        if filename.lower().endswith('.gif'):
+            # GIF-PIL writes each frame as it comes, where other gif writers can keep them all until close()
+            self.writer = imageio.get_writer(filename, format='GIF-PIL', mode='I', duration=duration)
+        else:
+            self.writer = imageio.get_writer(filename, mode='I', fps=1.0 / duration)
+
+        # Tracking
+        self.frames_pushed = 0
+        self.frames_written = 0
+
+    def wanted(self):
+        """
+        :return: True if the next frame pushed will be written (so a frame that isn't can be left undrawn)
+        """
+        if self.max_frames is not None and self.frames_written >= self.max_frames:
+            return False
+        return self.frames_pushed % self.every == 0
+
+    def push(self, frame):
+        """
+        Adds a frame to the file, unless it is decimated or over the limit
+        :param frame: height x width x 3 (or 4) uint8 array, or None for a frame that wasn't drawn
+                      because wanted() said it wouldn't be written
+        :return: True if the frame was written
+        """
+        written = self.wanted() and frame is not None
+        if written:
+            self.writer.append_data(frame)
+            self.frames_written += 1
+        self.frames_pushed += 1
+        return written
+
+    def close(self):
+        """
+        Finishes the file
+        :return: N/A
+        """
+        self.writer.close()
+
+
+def create(base_name, i, directory='Simulation'):
+    """
+    Makes directory/sim.gif from png files that were already written (base_name + 0 .png and up)
+    :param base_name: the start of the names of the png files
+    :param i: the number of iterations
+    :param directory: where the png files are
+    :return: N/A
+    """
+    encoder = Encoder(os.path.join(directory, 'sim.gif'))
+    for j in range(i-1):
+        filename = os.path.join(directory, base_name + str(j) + '.png')
+        if os.path.exists(filename):
+            encoder.push(imageio.imread(filename))
+    encoder.close()
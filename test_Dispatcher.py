@@ -0,0 +1,37 @@
+import unittest
+from Scenario import Scenario
+from Simulation import Simulation
+
+
+class DispatcherTest(unittest.TestCase):
+
+    def make_simulation(self, dispatch):
+        """
+        :return: a small simulation without a distance table or a path cache, so every route is searched for
+        """
+        scenario = Scenario(map_width=20, map_height=15, number_of_trucks=4, number_of_packages=10, seed=11)
+        return Simulation(scenario, use_distance_table=False, path_cache_size=0, dispatch=dispatch)
+
+    def test_single_truck_is_left_to_find_next_package(self):
+        for dispatch in ('assignment', 'batched'):
+            simulation = self.make_simulation(dispatch)
+            nodes_expanded = simulation.nodes_expanded
+            self.assertEqual(simulation.dispatcher.assign(simulation.trucks[:1]), [])
+            self.assertEqual(simulation.nodes_expanded, nodes_expanded)
+            self.assertEqual(simulation.dispatcher.searches, 0)
+            self.assertIsNone(simulation.trucks[0].assignment)
+
+    def test_assignment_sweeps_once_per_truck(self):
+        simulation = self.make_simulation('assignment')
+        pairs = simulation.dispatcher.assign(simulation.trucks[:2])
+        self.assertEqual(len(pairs), 2)
+        self.assertEqual(simulation.dispatcher.searches, 2)
+        for truck, package in pairs:
+            package_, path, cost = truck.assignment
+            self.assertIs(package_, package)
+            self.assertEqual(path[0], truck.location)
+            self.assertEqual(path[-1], package.source)
+
+
+if __name__ == '__main__':
+    unittest.main()
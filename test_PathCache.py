@@ -0,0 +1,42 @@
+import unittest
+import networkx as nx
+from AStar import Problem
+from CompactGraph import CompactGraph
+from PathCache import PathCache
+
+
+class PathCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        graph = nx.grid_2d_graph(6, 4)
+        for u, v in graph.edges():
+            graph[u][v]['weight'] = 1 + (u[0] * 7 + v[1] * 3) % 5
+        self.graph = CompactGraph.from_networkx(graph)
+        self.cache = PathCache(8)
+
+    def test_hit_is_the_same_as_the_miss(self):
+        problem = Problem((0, 0), (5, 3), self.graph)
+        miss = self.cache.search(problem)
+        hit = self.cache.search(problem)
+        self.assertEqual((self.cache.misses, self.cache.hits), (1, 1))
+        self.assertIs(type(miss[1]), list)
+        self.assertIs(type(hit[1]), list)
+        self.assertEqual(hit[1], miss[1])
+        self.assertEqual(hit[2], miss[2])
+
+    def test_reverse_hit_is_a_reversed_list(self):
+        forward = self.cache.search(Problem((0, 0), (5, 3), self.graph))
+        backward = self.cache.search(Problem((5, 3), (0, 0), self.graph))
+        self.assertEqual(self.cache.reverse_hits, 1)
+        self.assertIs(type(backward[1]), list)
+        self.assertEqual(backward[1], forward[1][::-1])
+
+    def test_changing_a_hit_leaves_the_cache_alone(self):
+        problem = Problem((0, 0), (5, 3), self.graph)
+        path = list(self.cache.search(problem)[1])
+        self.cache.search(problem)[1].append((9, 9))
+        self.assertEqual(self.cache.search(problem)[1], path)
+
+
+if __name__ == '__main__':
+    unittest.main()